@@ -0,0 +1,251 @@
+"""
+Availability engine - is a slot free, and which slots are free, for a staff member on a day.
+All active appointments needed for one day are read with a single query (indexed on staff, date)
+and kept as sorted, merged lists of occupied minute intervals per staff member and per user.
+Each check is then a bisect instead of a scan of Appointment.
+The occupied intervals of one staff member on one day are also cached (Django cache) for the
+slot API; bookings/signals.py drops the entry whenever an appointment for that day changes.
+"""
+import time as _time
+from bisect import bisect_right
+from datetime import time
+
+from django.core.cache import cache
+from django.db import transaction, IntegrityError, OperationalError
+from django.db.models import Q, F
+
+from services.models import Staff
+from .models import Appointment
+
+# Appointments in these statuses block their time slot.
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+# Parlour working hours and booking grid (minutes since midnight).
+OPENING_MINUTE = 10 * 60
+CLOSING_MINUTE = 20 * 60
+SLOT_STEP_MINUTES = 30
+
+# How long a cached (staff, date) slot grid may live even without invalidation.
+SLOT_CACHE_SECONDS = 60 * 60
+
+# reserve_slot: attempts before giving up when the database is locked or a race is lost.
+RESERVE_ATTEMPTS = 5
+
+
+class SlotTaken(Exception):
+    """The requested slot is not free; str(exc) is a message for the customer."""
+
+
+def to_minutes(t):
+    """datetime.time -> minutes since midnight."""
+    return t.hour * 60 + t.minute
+
+
+def to_time(minutes):
+    """Minutes since midnight -> datetime.time."""
+    return time(minutes // 60, minutes % 60)
+
+
+class IntervalList:
+    """Sorted, non-overlapping [start, end) minute intervals with bisect lookups."""
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                # Overlaps or touches the previous interval - merge.
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def is_free(self, start, end):
+        """True if [start, end) does not overlap any occupied interval."""
+        i = bisect_right(self.starts, start)
+        if i > 0 and self.ends[i - 1] > start:
+            return False
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def add(self, start, end):
+        """Mark [start, end) as occupied, merging with neighbours."""
+        i = bisect_right(self.starts, start)
+        if i > 0 and self.ends[i - 1] >= start:
+            i -= 1
+            start = self.starts[i]
+        j = i
+        while j < len(self.starts) and self.starts[j] <= end:
+            end = max(end, self.ends[j])
+            j += 1
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def free_starts(self, duration, opening=OPENING_MINUTE, closing=CLOSING_MINUTE, step=SLOT_STEP_MINUTES):
+        """Start minutes on the slot grid where `duration` minutes fit before closing."""
+        free = []
+        i = 0
+        n = len(self.starts)
+        for start in range(opening, closing - duration + 1, step):
+            # Skip intervals that end before this slot starts (slots only move forward).
+            while i < n and self.ends[i] <= start:
+                i += 1
+            if i == n or self.starts[i] >= start + duration:
+                free.append(start)
+        return free
+
+
+class DaySchedule:
+    """Occupied intervals for one date, per staff member and per user."""
+
+    def __init__(self, day, rows=()):
+        self.day = day
+        staff_intervals = {}
+        user_intervals = {}
+        for staff_id, user_id, start_time, duration in rows:
+            start = to_minutes(start_time)
+            interval = (start, start + (duration or 0))
+            if staff_id is not None:
+                staff_intervals.setdefault(staff_id, []).append(interval)
+            user_intervals.setdefault(user_id, []).append(interval)
+        self._staff = {k: IntervalList(v) for k, v in staff_intervals.items()}
+        self._users = {k: IntervalList(v) for k, v in user_intervals.items()}
+
+    @staticmethod
+    def day_queryset(day, staff=None, user=None):
+        """The single query behind load() (also used by the explain_hot_queries command)."""
+        qs = Appointment.objects.filter(date=day, status__in=ACTIVE_STATUSES)
+        if staff is not None or user is not None:
+            cond = Q()
+            if staff is not None:
+                cond |= Q(staff=staff)
+            if user is not None:
+                cond |= Q(user=user)
+            qs = qs.filter(cond)
+        return qs.order_by().values_list('staff_id', 'user_id', 'time', 'service__duration_minutes')
+
+    @classmethod
+    def load_many(cls, days, staff_ids=(), user=None):
+        """{day: DaySchedule} for several days in one query (the given staff members and user only)."""
+        cond = Q(staff_id__in=list(staff_ids))
+        if user is not None:
+            cond |= Q(user=user)
+        rows_by_day = {day: [] for day in days}
+        rows = (
+            Appointment.objects.filter(date__in=list(rows_by_day), status__in=ACTIVE_STATUSES)
+            .filter(cond).order_by()
+            .values_list('date', 'staff_id', 'user_id', 'time', 'service__duration_minutes')
+        )
+        for day, *row in rows:
+            rows_by_day[day].append(row)
+        return {day: cls(day, day_rows) for day, day_rows in rows_by_day.items()}
+
+    @classmethod
+    def load(cls, day, staff=None, user=None):
+        """
+        One query for the day. Pass staff and/or user to load only their appointments;
+        with neither, every active appointment of the day is loaded.
+        """
+        return cls(day, cls.day_queryset(day, staff=staff, user=user))
+
+    def staff_intervals(self, staff_id):
+        return self._staff.get(staff_id) or IntervalList()
+
+    def user_intervals(self, user_id):
+        return self._users.get(user_id) or IntervalList()
+
+    def is_staff_free(self, staff_id, start_time, duration):
+        start = to_minutes(start_time)
+        return self.staff_intervals(staff_id).is_free(start, start + duration)
+
+    def is_user_free(self, user_id, start_time, duration):
+        start = to_minutes(start_time)
+        return self.user_intervals(user_id).is_free(start, start + duration)
+
+    def free_slots(self, duration, staff_id=None, user_id=None):
+        """List of datetime.time slot starts free for the staff member (and user, if given)."""
+        starts = self.staff_intervals(staff_id).free_starts(duration)
+        if user_id is not None:
+            busy = self.user_intervals(user_id)
+            starts = [s for s in starts if busy.is_free(s, s + duration)]
+        return [to_time(s) for s in starts]
+
+    def book(self, staff_id, user_id, start_time, duration):
+        """Record a new booking in the in-memory index (after it is saved)."""
+        start = to_minutes(start_time)
+        if staff_id is not None:
+            self._staff.setdefault(staff_id, IntervalList()).add(start, start + duration)
+        self._users.setdefault(user_id, IntervalList()).add(start, start + duration)
+
+
+def slot_cache_key(staff_id, day):
+    return f'bookings:slots:{staff_id}:{day.isoformat()}'
+
+
+def cached_staff_intervals(staff_id, day):
+    """Occupied intervals of one staff member on one day - from cache, else one query."""
+    key = slot_cache_key(staff_id, day)
+    cached = cache.get(key)
+    if cached is None:
+        intervals = DaySchedule.load(day, staff=staff_id).staff_intervals(staff_id)
+        cached = list(zip(intervals.starts, intervals.ends))
+        cache.set(key, cached, SLOT_CACHE_SECONDS)
+    return IntervalList(cached)
+
+
+def invalidate_staff_day(staff_id, day):
+    """Forget the cached slot grid of a staff member for a day."""
+    if staff_id is not None and day is not None:
+        cache.delete(slot_cache_key(staff_id, day))
+
+
+def lock_staff(staff_ids):
+    """
+    No-op write to the staff rows: a row lock on Postgres/MySQL, the database write lock on SQLite.
+    Concurrent reservations for the same staff members queue up here until the transaction ends.
+    """
+    Staff.objects.filter(pk__in=list(staff_ids)).update(is_active=F('is_active'))
+
+
+def is_database_locked(exc):
+    """True for SQLite's "database is locked" / busy errors, which are worth retrying."""
+    message = str(exc).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def reserve_slot(user, service, staff, appt_date, appt_time, notes=''):
+    """
+    Atomically check the slot and create a pending Appointment. Raises SlotTaken if it overlaps.
+    The unique constraints on Appointment are the final guard: if another request wins the race
+    between our check and our insert, the IntegrityError rolls back and we re-check, which then
+    reports the clash.
+    """
+    duration = service.duration_minutes
+    for attempt in range(RESERVE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                if staff is not None:
+                    lock_staff([staff.pk])
+                schedule = DaySchedule.load(appt_date, staff=staff, user=user)
+                if not schedule.is_user_free(user.id, appt_time, duration):
+                    raise SlotTaken('You already have an appointment overlapping this time.')
+                if staff is not None and not schedule.is_staff_free(staff.id, appt_time, duration):
+                    raise SlotTaken(f'{staff.name} is already booked at this time. Please choose another slot.')
+                return Appointment.objects.create(
+                    user=user,
+                    service=service,
+                    staff=staff,
+                    date=appt_date,
+                    time=appt_time,
+                    notes=notes,
+                    status='pending',
+                )
+        except IntegrityError:
+            continue  # Lost the race on the unique constraint - re-check to report the clash.
+        except OperationalError as exc:
+            if not is_database_locked(exc):
+                raise  # A real database error, not contention - do not report it as a taken slot.
+            _time.sleep(0.05 * (attempt + 1))  # SQLite "database is locked" - back off and retry.
+    raise SlotTaken('This slot was just taken. Please choose another time.')
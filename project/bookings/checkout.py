@@ -0,0 +1,92 @@
+"""
+Cart checkout - book every cart item in one go.
+All requested slots are validated with one batched query (DaySchedule.load_many), then the
+Appointments and their Payments are bulk-created, one CartPayment covers the total and the
+cart is emptied - all in a single transaction, so a cart is never left half booked.
+"""
+import time as _time
+from decimal import Decimal
+
+from django.db import transaction, IntegrityError, OperationalError
+
+from payments.models import CartPayment, Payment
+from .availability import (
+    DaySchedule, SlotTaken, RESERVE_ATTEMPTS, is_database_locked, lock_staff, invalidate_staff_day,
+)
+from .models import Appointment
+
+
+class CheckoutSlot:
+    """One appointment to book: a cart item's service at a date/time, optionally with staff."""
+
+    def __init__(self, service, date, time, staff=None, notes=''):
+        self.service = service
+        self.date = date
+        self.time = time
+        self.staff = staff
+        self.notes = notes
+
+    def describe(self):
+        return f"{self.service.name} on {self.date:%d %b} at {self.time:%H:%M}"
+
+
+def _check_slots(user, slots):
+    """Raise SlotTaken for the first slot that clashes with existing bookings or an earlier slot."""
+    staff_ids = {s.staff.pk for s in slots if s.staff is not None}
+    schedules = DaySchedule.load_many({s.date for s in slots}, staff_ids=staff_ids, user=user)
+    for slot in slots:
+        schedule = schedules[slot.date]
+        duration = slot.service.duration_minutes
+        staff_id = slot.staff.pk if slot.staff is not None else None
+        if not schedule.is_user_free(user.id, slot.time, duration):
+            raise SlotTaken(f'{slot.describe()}: you already have an appointment overlapping this time.')
+        if staff_id is not None and not schedule.is_staff_free(staff_id, slot.time, duration):
+            raise SlotTaken(f'{slot.describe()}: {slot.staff.name} is already booked at this time.')
+        # Later slots in the same checkout must not overlap this one either.
+        schedule.book(staff_id, user.id, slot.time, duration)
+
+
+def checkout_cart(user, cart, slots):
+    """
+    Book all slots, create their Payments and one CartPayment, and empty the cart.
+    Returns the CartPayment. Raises SlotTaken (nothing is written) if any slot is not free.
+    """
+    for attempt in range(RESERVE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                lock_staff({s.staff.pk for s in slots if s.staff is not None})
+                _check_slots(user, slots)
+                appointments = Appointment.objects.bulk_create([
+                    Appointment(
+                        user=user, service=s.service, staff=s.staff, date=s.date, time=s.time,
+                        notes=s.notes, status='pending',
+                    )
+                    for s in slots
+                ])
+                cart_payment = CartPayment.objects.create(
+                    user=user,
+                    amount=sum((s.service.price for s in slots), Decimal('0')),
+                )
+                Payment.objects.bulk_create([
+                    Payment(
+                        appointment=appt, amount=appt.service.price, method='online',
+                        status='pending', cart_payment=cart_payment,
+                    )
+                    for appt in appointments
+                ])
+                cart.items.all().delete()
+                cart.refresh_totals()
+            break
+        except IntegrityError:
+            continue  # Lost a race on the unique constraints - re-check to report the clash.
+        except OperationalError as exc:
+            if not is_database_locked(exc):
+                raise
+            _time.sleep(0.05 * (attempt + 1))  # SQLite "database is locked" - back off and retry.
+    else:
+        raise SlotTaken('Some of these slots were just taken. Please review your times and try again.')
+    # bulk_create sends no post_save signals - drop the cached slot grids ourselves.
+    for s in slots:
+        if s.staff is not None:
+            invalidate_staff_day(s.staff.pk, s.date)
+    return cart_payment
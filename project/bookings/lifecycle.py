@@ -0,0 +1,55 @@
+"""
+Appointment lifecycle - move confirmed appointments that have finished to 'completed'.
+An appointment has finished once date + time + its service's duration_minutes is in the past
+(parlour local time). Run from cron / a scheduler every minute via
+`manage.py complete_past_appointments`; it is idempotent, so overlapping runs are harmless.
+Candidates are read in keyset chunks from the (status, date) index, and each chunk is one
+short UPDATE ... WHERE id IN (...) AND status = 'confirmed', so the SQLite write lock is never
+held for long and an appointment cancelled meanwhile is left alone.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import invalidate_staff_day
+from .models import Appointment
+
+COMPLETE_CHUNK_SIZE = 500
+
+
+def finished_by(appt_date, appt_time, duration_minutes, now):
+    """True if an appointment starting at appt_date/appt_time has ended by naive local `now`."""
+    return datetime.combine(appt_date, appt_time) + timedelta(minutes=duration_minutes) <= now
+
+
+def complete_past_appointments(now=None, chunk_size=COMPLETE_CHUNK_SIZE):
+    """Mark every finished confirmed appointment as completed. Returns how many were updated."""
+    now = timezone.localtime(now).replace(tzinfo=None)
+    candidates = (
+        Appointment.objects.filter(status='confirmed', date__lte=now.date())
+        .order_by('date', 'id')
+        .values_list('id', 'date', 'time', 'staff_id', 'service__duration_minutes')
+    )
+    completed = 0
+    touched_days = set()
+    after = Q()
+    while True:
+        rows = list(candidates.filter(after)[:chunk_size])
+        if not rows:
+            break
+        last_id, last_date = rows[-1][0], rows[-1][1]
+        after = Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id)
+        done = [row for row in rows if finished_by(row[1], row[2], row[4], now)]
+        if not done:
+            continue
+        with transaction.atomic():
+            completed += Appointment.objects.filter(
+                id__in=[row[0] for row in done], status='confirmed',
+            ).update(status='completed')
+        touched_days.update((row[3], row[1]) for row in done if row[3] is not None)
+    # update() sends no signals - drop the cached slot grids ourselves.
+    for staff_id, day in touched_days:
+        invalidate_staff_day(staff_id, day)
+    return completed
@@ -0,0 +1,88 @@
+"""
+Benchmark the availability engine (bookings/availability.py) on one very busy day.
+Creates synthetic staff, users and appointments inside a transaction that is rolled back,
+so the real database is left untouched.
+Run: python manage.py bench_availability --appointments 10000
+"""
+import random
+import time as timer
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookings.availability import DaySchedule, OPENING_MINUTE, CLOSING_MINUTE, SLOT_STEP_MINUTES, to_time
+from bookings.models import Appointment
+from services.models import Service, Staff
+
+
+class Command(BaseCommand):
+    help = 'Benchmark slot availability checks with many appointments on one day (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=10000, help='Appointments on the day')
+        parser.add_argument('--staff', type=int, default=1000, help='Number of staff members')
+        parser.add_argument('--checks', type=int, default=10000, help='Random is-free checks to run')
+
+    def handle(self, *args, **options):
+        n_appts = options['appointments']
+        n_staff = options['staff']
+        n_checks = options['checks']
+        with transaction.atomic():
+            self._run(n_appts, n_staff, n_checks)
+            transaction.set_rollback(True)
+
+    def _run(self, n_appts, n_staff, n_checks):
+        rnd = random.Random(42)
+        day = date.today() + timedelta(days=1)
+        service = Service.objects.create(name='Bench Service', price=100, duration_minutes=30)
+        staff_ids = [s.id for s in Staff.objects.bulk_create(
+            [Staff(name=f'Bench Staff {i}') for i in range(n_staff)]
+        )]
+        grid = list(range(OPENING_MINUTE, CLOSING_MINUTE, SLOT_STEP_MINUTES))
+        if n_appts > n_staff * len(grid):
+            raise CommandError(f'At most {n_staff * len(grid)} appointments fit {n_staff} staff on one day.')
+        # Distinct (staff, slot) and (user, slot) pairs - the one-active-booking-per-slot constraints.
+        by_slot = {}
+        for staff_index, minute in rnd.sample([(s, m) for s in range(n_staff) for m in grid], n_appts):
+            by_slot.setdefault(minute, []).append(staff_ids[staff_index])
+        n_users = max(1, n_appts // 10, max(len(staff) for staff in by_slot.values()))
+        user_ids = [u.id for u in User.objects.bulk_create(
+            [User(username=f'bench_user_{i}') for i in range(n_users)]
+        )]
+        Appointment.objects.bulk_create([
+            Appointment(
+                user_id=user_id, service=service, staff_id=staff_id,
+                date=day, time=to_time(minute), status='confirmed',
+            )
+            for minute, slot_staff in by_slot.items()
+            for staff_id, user_id in zip(slot_staff, rnd.sample(user_ids, len(slot_staff)))
+        ], batch_size=2000)
+        self.stdout.write(f'{n_appts} appointments, {n_staff} staff on {day}')
+
+        # Whole day, one query
+        t0 = timer.perf_counter()
+        schedule = DaySchedule.load(day)
+        load_ms = (timer.perf_counter() - t0) * 1000
+        self.stdout.write(f'  DaySchedule.load (whole day):    {load_ms:8.2f} ms')
+
+        # One staff member + one user (what booking_view does)
+        t0 = timer.perf_counter()
+        for staff_id in staff_ids[:100]:
+            DaySchedule.load(day, staff=staff_id, user=user_ids[0])
+        per_load_ms = (timer.perf_counter() - t0) * 1000 / 100
+        self.stdout.write(f'  DaySchedule.load (staff + user): {per_load_ms:8.2f} ms / call')
+
+        t0 = timer.perf_counter()
+        free = 0
+        for _ in range(n_checks):
+            if schedule.is_staff_free(rnd.choice(staff_ids), to_time(rnd.choice(grid)), 45):
+                free += 1
+        check_us = (timer.perf_counter() - t0) * 1e6 / n_checks
+        self.stdout.write(f'  is_staff_free:                   {check_us:8.2f} us / check ({free}/{n_checks} free)')
+
+        t0 = timer.perf_counter()
+        total_slots = sum(len(schedule.free_slots(service.duration_minutes, staff_id=s)) for s in staff_ids)
+        slots_us = (timer.perf_counter() - t0) * 1e6 / n_staff
+        self.stdout.write(f'  free_slots per staff member:     {slots_us:8.2f} us ({total_slots} free slots in total)')
@@ -0,0 +1,86 @@
+"""
+Stress test for reserve_slot (bookings/availability.py): many threads try to book the same
+staff member at the same (or overlapping) time. Exactly one booking must succeed.
+Synthetic users/staff/service are created for the run and deleted afterwards.
+Run: python manage.py bench_booking_contention --threads 200
+"""
+import threading
+import time as timer
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+
+from bookings.availability import SlotTaken, reserve_slot, to_time
+from bookings.models import Appointment
+from services.models import Service, Staff
+
+
+class Command(BaseCommand):
+    help = 'Fire many simultaneous bookings at one slot and check that exactly one succeeds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=200, help='Concurrent booking attempts')
+        parser.add_argument(
+            '--spread', type=int, default=0,
+            help='Spread start times over this many minutes (overlapping, not identical, slots)',
+        )
+
+    def handle(self, *args, **options):
+        n = options['threads']
+        spread = options['spread']
+        service = Service.objects.create(name='Contention Bench Service', price=100, duration_minutes=45, is_active=False)
+        staff = Staff.objects.create(name='Contention Bench Staff', is_active=False)
+        User.objects.bulk_create([User(username=f'contention_bench_{i}') for i in range(n)])
+        users = list(User.objects.filter(username__startswith='contention_bench_'))
+        day = date.today() + timedelta(days=1)
+        # Every start time is within the 45 minute service, so all attempts overlap each other.
+        start_minutes = [10 * 60 + (i % (spread + 1) if spread else 0) for i in range(n)]
+
+        barrier = threading.Barrier(n)
+        results = []
+        lock = threading.Lock()
+
+        def attempt(user, minute):
+            close_old_connections()
+            try:
+                barrier.wait()
+                try:
+                    reserve_slot(user, service, staff, day, to_time(minute))
+                    outcome = 'booked'
+                except SlotTaken:
+                    outcome = 'taken'
+                except Exception as exc:  # report, do not hide, anything unexpected
+                    outcome = f'error: {exc!r}'
+                with lock:
+                    results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(u, m)) for u, m in zip(users, start_minutes)]
+        try:
+            t0 = timer.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = timer.perf_counter() - t0
+
+            booked = results.count('booked')
+            taken = results.count('taken')
+            errors = [r for r in results if r.startswith('error')]
+            stored = Appointment.objects.filter(staff=staff, date=day, status__in=['pending', 'confirmed']).count()
+            self.stdout.write(f'{n} concurrent attempts in {elapsed:.2f}s ({n / elapsed:.0f} attempts/s)')
+            self.stdout.write(f'  booked: {booked}, slot taken: {taken}, errors: {len(errors)}, rows stored: {stored}')
+            for e in errors[:5]:
+                self.stdout.write(f'  {e}')
+        finally:
+            Appointment.objects.filter(service=service).delete()
+            User.objects.filter(username__startswith='contention_bench_').delete()
+            service.delete()
+            staff.delete()
+
+        if booked != 1 or stored != 1 or errors:
+            raise CommandError('Expected exactly one successful booking.')
+        self.stdout.write(self.style.SUCCESS('OK - exactly one booking succeeded.'))
@@ -0,0 +1,22 @@
+"""
+Mark confirmed appointments that have ended (date + time + service duration) as completed.
+Idempotent and quick when there is nothing to do - schedule it every minute, e.g. with cron:
+    * * * * * cd /path/to/project && python manage.py complete_past_appointments --quiet
+Run: python manage.py complete_past_appointments [--chunk-size 500]
+"""
+from django.core.management.base import BaseCommand
+
+from bookings.lifecycle import COMPLETE_CHUNK_SIZE, complete_past_appointments
+
+
+class Command(BaseCommand):
+    help = 'Move finished confirmed appointments to completed, in chunked UPDATEs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=COMPLETE_CHUNK_SIZE, help='Rows per UPDATE')
+        parser.add_argument('--quiet', action='store_true', help='Only print when something changed')
+
+    def handle(self, *args, **options):
+        count = complete_past_appointments(chunk_size=options['chunk_size'])
+        if count or not options['quiet']:
+            self.stdout.write(self.style.SUCCESS(f'Completed {count} appointments.'))
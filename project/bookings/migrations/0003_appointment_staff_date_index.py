@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_add_cart_and_favourites'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['staff', 'date'], name='appt_staff_date_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+ACTIVE = ['pending', 'confirmed']
+BATCH = 500
+
+
+def _clashes(rows):
+    """ids of every row after the first in each run of rows with the same (owner, date, time)."""
+    seen = set()
+    for pk, owner_id, day, start in rows.iterator():
+        if (owner_id, day, start) in seen:
+            yield pk
+        else:
+            seen.add((owner_id, day, start))
+
+
+def _update(Appointment, ids, **fields):
+    for offset in range(0, len(ids), BATCH):
+        Appointment.objects.filter(pk__in=ids[offset:offset + BATCH]).update(**fields)
+
+
+def resolve_double_bookings(apps, schema_editor):
+    """
+    Existing double-bookings would fail the new constraints. Nothing is deleted and every
+    changed id is printed:
+    - the same staff member twice in one slot (the clashes fixed by hand so far): the customers
+      keep their bookings, all but one lose the staff assignment (staff NULL) for an admin to
+      reassign - confirmed before pending, then the earliest booked keeps it;
+    - the same user twice in one slot: one booking is kept - paid first, then confirmed, then
+      the earliest - and the others are cancelled (paid ones are listed for a refund).
+    """
+    Appointment = apps.get_model('bookings', 'Appointment')
+    active = Appointment.objects.filter(status__in=ACTIVE)
+
+    unassigned = list(_clashes(
+        active.filter(staff__isnull=False)
+        .order_by('staff', 'date', 'time', 'status', 'id')  # 'confirmed' sorts before 'pending'
+        .values_list('id', 'staff', 'date', 'time')
+    ))
+    _update(Appointment, unassigned, staff=None)
+
+    paid = models.Exists(apps.get_model('payments', 'Payment').objects.filter(
+        appointment=models.OuterRef('pk'), status='paid',
+    ))
+    cancelled = list(_clashes(
+        active.annotate(paid=paid)
+        .order_by('user', 'date', 'time', '-paid', 'status', 'id')
+        .values_list('id', 'user', 'date', 'time')
+    ))
+    paid_cancelled = list(
+        Appointment.objects.filter(pk__in=cancelled, payment__status='paid').values_list('id', flat=True)
+    )
+    _update(Appointment, cancelled, status='cancelled')
+
+    if unassigned:
+        print(f'\n  Staff double-bookings - staff removed, reassign: appointments {unassigned}')
+    if cancelled:
+        print(f'\n  Same-user double-bookings - cancelled: appointments {cancelled}')
+    if paid_cancelled:
+        print(f'\n  Cancelled but paid - refund: appointments {paid_cancelled}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_appointment_staff_date_index'),
+        ('payments', '0001_initial'),  # resolve_double_bookings reads Payment.
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('staff', 'date', 'time'), name='appt_unique_active_staff_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=('user', 'date', 'time'), name='appt_unique_active_user_slot'),
+        ),
+    ]
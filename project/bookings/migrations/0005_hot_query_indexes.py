@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_appointment_active_slot_constraints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['user', 'date', 'time'], name='appt_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'time'], name='appt_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfavourite',
+            index=models.Index(fields=['user', '-created_at'], name='fav_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:15
+
+from django.db import migrations, models
+from django.db.models import F, Sum, ExpressionWrapper
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('bookings', 'Cart')
+    line_total = ExpressionWrapper(
+        F('service__price') * F('quantity'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
+    for cart in Cart.objects.all().iterator():
+        agg = cart.items.aggregate(count=Sum('quantity'), total=Sum(line_total))
+        Cart.objects.filter(pk=cart.pk).update(item_count=agg['count'] or 0, total=agg['total'] or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
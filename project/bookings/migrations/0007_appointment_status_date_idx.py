@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_cart_denormalized_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date'], name='appt_status_date_idx'),
+        ),
+    ]
@@ -2,8 +2,20 @@
 Bookings app - Appointment, Cart, CartItem, UserFavourite.
 User books Appointment for a Service; Cart and Favourites for users (not admins).
 """
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Sum, Window, ExpressionWrapper
 from django.conf import settings
+from django.utils import timezone
+
+
+def _line_total():
+    """price x quantity for a CartItem row, as a decimal expression."""
+    return ExpressionWrapper(
+        F('service__price') * F('quantity'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    )
 
 
 class Cart(models.Model):
@@ -13,10 +25,54 @@ class Cart(models.Model):
         on_delete=models.CASCADE,
         related_name='cart'
     )
+    # Denormalized from the items (kept in step by refresh_totals) - a cart badge needs only this row.
+    item_count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def items_with_totals(self):
+        """Items with service, line_total and cart_total (same value on every row) - one query."""
+        return self.items.select_related('service').annotate(
+            line_total=_line_total(),
+            cart_total=Window(Sum(_line_total())),
+        )
+
     def total_price(self):
-        return sum(item.service.price * item.quantity for item in self.items.select_related('service'))
+        return self.items.aggregate(total=Sum(_line_total()))['total'] or Decimal('0')
+
+    def add_service(self, service):
+        """
+        Add one unit of service: atomic upsert, increment done in SQL (F) so concurrent clicks
+        are not lost. Returns the new quantity. Totals are refreshed in the same transaction.
+        """
+        with transaction.atomic():
+            items = CartItem.objects.filter(cart=self, service=service)
+            if not items.update(quantity=F('quantity') + 1):
+                try:
+                    with transaction.atomic():
+                        CartItem.objects.create(cart=self, service=service, quantity=1)
+                except IntegrityError:
+                    # A concurrent request inserted the row first - increment it instead.
+                    items.update(quantity=F('quantity') + 1)
+            self.refresh_totals()
+            return items.values_list('quantity', flat=True).first() or 0
+
+    def remove_service(self, service_id):
+        """Remove a service (all units) from the cart. Returns True if it was there."""
+        with transaction.atomic():
+            deleted, _ = CartItem.objects.filter(cart=self, service_id=service_id).delete()
+            if deleted:
+                self.refresh_totals()
+        return bool(deleted)
+
+    def refresh_totals(self):
+        """Recompute item_count / total from the items; call in the transaction that changed them."""
+        agg = self.items.aggregate(count=Sum('quantity'), total=Sum(_line_total()))
+        self.item_count = agg['count'] or 0
+        self.total = agg['total'] or Decimal('0')
+        Cart.objects.filter(pk=self.pk).update(
+            item_count=self.item_count, total=self.total, updated_at=timezone.now()
+        )
 
     def __str__(self):
         return f"Cart of {self.user.username}"
@@ -56,6 +112,10 @@ class UserFavourite(models.Model):
     class Meta:
         unique_together = [['user', 'service']]
         ordering = ['-created_at']
+        indexes = [
+            # Saved list: filter by user, newest first
+            models.Index(fields=['user', '-created_at'], name='fav_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} saved {self.service.name}"
@@ -94,6 +154,31 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            # Availability engine: one query per (staff, date)
+            models.Index(fields=['staff', 'date'], name='appt_staff_date_idx'),
+            # My Appointments and the booking clash check: filter by user, newest date/time first.
+            # No status column: the implicit trailing id then also serves the history keyset sort.
+            models.Index(fields=['user', 'date', 'time'], name='appt_user_date_time_idx'),
+            # Admin panel list ordered by -date, -time
+            models.Index(fields=['date', 'time'], name='appt_date_time_idx'),
+            # complete_past_appointments: confirmed rows up to today, keyset over (date, id).
+            models.Index(fields=['status', 'date'], name='appt_status_date_idx'),
+        ]
+        constraints = [
+            # No two active bookings at the same start time for a staff member or a user.
+            # Enforced by the database, so concurrent booking requests cannot both win.
+            models.UniqueConstraint(
+                fields=['staff', 'date', 'time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='appt_unique_active_staff_slot',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'date', 'time'],
+                condition=models.Q(status__in=['pending', 'confirmed']),
+                name='appt_unique_active_user_slot',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.service.name} on {self.date}"
@@ -0,0 +1,58 @@
+"""
+Bookings app signals - drop cached data when the rows behind it change:
+- the (staff, date) slot grid when an Appointment is created, updated (e.g. cancelled) or deleted -
+  for a moved appointment both the old and the new (staff, date), once the transaction commits;
+- a user's cart / favourite id sets when a CartItem / UserFavourite is saved or deleted, also
+  after commit.
+Connected in BookingsConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Appointment, Cart, CartItem, UserFavourite
+from .availability import invalidate_staff_day
+from .user_state import invalidate_cart, invalidate_favourites
+
+
+@receiver(pre_save, sender=Appointment)
+def appointment_saving(sender, instance, raw=False, **kwargs):
+    # Where the appointment was before this save, so a move also frees the old slot.
+    old = None
+    if instance.pk and not raw:
+        old = Appointment.objects.filter(pk=instance.pk).values_list('staff_id', 'date').first()
+    instance._old_staff_day = old
+
+
+def _invalidate_staff_day_on_commit(staff_id, day):
+    # After commit, so a slot request in between cannot re-cache the grid from the old rows.
+    transaction.on_commit(lambda: invalidate_staff_day(staff_id, day))
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, **kwargs):
+    _invalidate_staff_day_on_commit(instance.staff_id, instance.date)
+    old = getattr(instance, '_old_staff_day', None)
+    if old is not None and old != (instance.staff_id, instance.date):
+        _invalidate_staff_day_on_commit(*old)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    _invalidate_staff_day_on_commit(instance.staff_id, instance.date)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def cart_item_changed(sender, instance, **kwargs):
+    user_id = Cart.objects.filter(pk=instance.cart_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        # After commit, like the slot grids: Cart.add_service / checkout_cart run in atomic().
+        transaction.on_commit(lambda: invalidate_cart(user_id))
+
+
+@receiver(post_save, sender=UserFavourite)
+@receiver(post_delete, sender=UserFavourite)
+def favourite_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_favourites(user_id))
@@ -3,12 +3,19 @@ from . import views
 
 urlpatterns = [
     path('book/<int:service_id>/', views.booking_view, name='booking'),
+    path('book/<int:service_id>/slots/', views.booking_slots_view, name='booking_slots'),
     path('my-appointments/', views.my_appointments_view, name='my_appointments'),
     path('cancel/<int:appointment_id>/', views.cancel_appointment_view, name='cancel_appointment'),
     path('cart/', views.cart_view, name='cart'),
     path('cart/add/<int:service_id>/', views.add_to_cart_view, name='add_to_cart'),
     path('cart/remove/<int:service_id>/', views.remove_from_cart_view, name='remove_from_cart'),
+    path('cart/checkout/', views.checkout_view, name='checkout'),
     path('saved/', views.saved_list_view, name='saved_list'),
     path('saved/add/<int:service_id>/', views.add_to_favourites_view, name='add_to_favourites'),
     path('saved/remove/<int:service_id>/', views.remove_from_favourites_view, name='remove_from_favourites'),
+    # JSON (POST) variants for add/remove without a page reload
+    path('api/cart/add/<int:service_id>/', views.api_add_to_cart_view, name='api_add_to_cart'),
+    path('api/cart/remove/<int:service_id>/', views.api_remove_from_cart_view, name='api_remove_from_cart'),
+    path('api/saved/add/<int:service_id>/', views.api_add_to_favourites_view, name='api_add_to_favourites'),
+    path('api/saved/remove/<int:service_id>/', views.api_remove_from_favourites_view, name='api_remove_from_favourites'),
 ]
@@ -0,0 +1,46 @@
+"""
+Per-user cart and favourite service ids, cached so the user_cart_favourites context processor
+does not query on every page. bookings/signals.py drops the cached set whenever a CartItem
+or UserFavourite is saved or deleted.
+"""
+from django.core.cache import cache
+
+from .models import CartItem, UserFavourite
+
+USER_STATE_CACHE_SECONDS = 24 * 60 * 60
+
+
+def _cart_key(user_id):
+    return f'bookings:cart_ids:{user_id}'
+
+
+def _favourites_key(user_id):
+    return f'bookings:favourite_ids:{user_id}'
+
+
+def cart_service_ids(user_id):
+    """frozenset of service ids in the user's cart."""
+    key = _cart_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(CartItem.objects.filter(cart__user_id=user_id).values_list('service_id', flat=True))
+        cache.set(key, ids, USER_STATE_CACHE_SECONDS)
+    return ids
+
+
+def favourite_service_ids(user_id):
+    """frozenset of service ids the user has saved."""
+    key = _favourites_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(UserFavourite.objects.filter(user_id=user_id).values_list('service_id', flat=True))
+        cache.set(key, ids, USER_STATE_CACHE_SECONDS)
+    return ids
+
+
+def invalidate_cart(user_id):
+    cache.delete(_cart_key(user_id))
+
+
+def invalidate_favourites(user_id):
+    cache.delete(_favourites_key(user_id))
@@ -5,16 +5,30 @@ Protected with @login_required for user-only features.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.utils import timezone
 from datetime import datetime, date
+from decimal import Decimal
 
+from config.pagination import paginate_keyset
+from payments.processing import expire_stale_attempts
 from services.models import Service, Staff
-from .models import Appointment, Cart, CartItem, UserFavourite
+from .models import Appointment, Cart, UserFavourite
+from .checkout import CheckoutSlot, checkout_cart
+from .availability import (
+    ACTIVE_STATUSES, DaySchedule, IntervalList, SlotTaken, cached_staff_intervals, reserve_slot, to_minutes,
+)
+
+# Booking history on My Appointments: newest first, id breaks ties for the keyset cursor
+HISTORY_ORDERING = ['-date', '-time', '-id']
+HISTORY_PAGE_SIZE = 20
 
 
 @login_required
 def booking_view(request, service_id):
-    """Booking page - select date, time; prevent same user same slot clash."""
+    """Booking page - select date, time; reject slots overlapping the user's or the staff member's bookings."""
     service = get_object_or_404(Service, pk=service_id, is_active=True)
     staff_list = Staff.objects.filter(is_active=True)
 
@@ -48,33 +62,19 @@ def booking_view(request, service_id):
                 'staff_list': staff_list,
             })
 
-        # Simple clash: same user, same date, same time (any service)
-        clash = Appointment.objects.filter(
-            user=request.user,
-            date=appt_date,
-            time=appt_time,
-            status__in=['pending', 'confirmed']
-        ).exists()
-        if clash:
-            messages.error(request, 'You already have an appointment at this date and time.')
-            return render(request, 'bookings/booking.html', {
-                'service': service,
-                'staff_list': staff_list,
-            })
-
         staff = None
         if staff_id:
             staff = Staff.objects.filter(pk=staff_id, is_active=True).first()
 
-        appointment = Appointment.objects.create(
-            user=request.user,
-            service=service,
-            staff=staff,
-            date=appt_date,
-            time=appt_time,
-            notes=notes,
-            status='pending',
-        )
+        # Overlap check and insert in one transaction, backed by unique constraints
+        try:
+            appointment = reserve_slot(request.user, service, staff, appt_date, appt_time, notes)
+        except SlotTaken as exc:
+            messages.error(request, str(exc))
+            return render(request, 'bookings/booking.html', {
+                'service': service,
+                'staff_list': staff_list,
+            })
         messages.success(request, 'Appointment booked! Proceed to payment.')
         return redirect('payment', appointment.id)
 
@@ -84,26 +84,58 @@ def booking_view(request, service_id):
     })
 
 
+@login_required
+def booking_slots_view(request, service_id):
+    """JSON API: free start times for a service on ?date=YYYY-MM-DD, optionally for ?staff=<id>."""
+    service = get_object_or_404(Service, pk=service_id, is_active=True)
+    try:
+        appt_date = datetime.strptime(request.GET.get('date') or '', '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date.'}, status=400)
+    staff_id = request.GET.get('staff') or None
+    if staff_id is not None:
+        if not staff_id.isdigit() or not Staff.objects.filter(pk=staff_id, is_active=True).exists():
+            return JsonResponse({'error': 'Invalid staff.'}, status=400)
+        staff_id = int(staff_id)
+
+    today = date.today()
+    duration = service.duration_minutes
+    slots = []
+    if appt_date >= today:
+        # Staff grid comes from the per-(staff, date) cache; the user's own bookings are a small query.
+        staff_busy = cached_staff_intervals(staff_id, appt_date) if staff_id else IntervalList()
+        user_busy = DaySchedule.load(appt_date, user=request.user).user_intervals(request.user.id)
+        earliest = to_minutes(timezone.localtime().time()) if appt_date == today else 0
+        slots = [
+            start for start in staff_busy.free_starts(duration)
+            if start >= earliest and user_busy.is_free(start, start + duration)
+        ]
+    return JsonResponse({
+        'date': appt_date.isoformat(),
+        'staff': staff_id,
+        'duration_minutes': duration,
+        'slots': ['%02d:%02d' % divmod(start, 60) for start in slots],
+    })
+
+
 @login_required
 def my_appointments_view(request):
-    """List current user's appointments: Upcoming and Booking history (past/completed/cancelled)."""
+    """List current user's appointments: Upcoming and Booking history (past/completed/cancelled, paginated)."""
     today = date.today()
-    all_appointments = Appointment.objects.filter(user=request.user).select_related(
-        'service', 'staff'
-    ).order_by('-date', '-time')
+    # An online payment whose webhook never came shows Pay Now again instead of 'processing'.
+    expire_stale_attempts(Q(user=request.user))
+    mine = Appointment.objects.filter(user=request.user).select_related('service', 'staff', 'payment')
     # Upcoming: pending/confirmed with date >= today
-    upcoming_appointments = [
-        a for a in all_appointments
-        if a.status in ('pending', 'confirmed') and (a.date > today or (a.date == today and a.time))
-    ]
-    # History: completed, cancelled, or past date
-    past_appointments = [
-        a for a in all_appointments
-        if a not in upcoming_appointments
-    ]
+    is_upcoming = Q(status__in=ACTIVE_STATUSES, date__gte=today)
+    upcoming_appointments = mine.filter(is_upcoming).order_by('-date', '-time')
+    # History: completed, cancelled, or past date - keyset pages, newest first
+    past_page = paginate_keyset(
+        mine.exclude(is_upcoming), HISTORY_ORDERING,
+        cursor=request.GET.get('cursor'), per_page=HISTORY_PAGE_SIZE,
+    )
     return render(request, 'bookings/my_appointments.html', {
         'upcoming_appointments': upcoming_appointments,
-        'past_appointments': past_appointments,
+        'past_appointments': past_page,
     })
 
 
@@ -123,10 +155,14 @@ def cancel_appointment_view(request, appointment_id):
 # ---------- Cart (add to cart, view cart, remove) ----------
 @login_required
 def cart_view(request):
-    """View cart with total price."""
+    """View cart with line totals and grand total (computed in the same query as the items)."""
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    items = cart.items.select_related('service').all()
-    total = cart.total_price()
+    items = list(cart.items_with_totals())
+    total = items[0].cart_total if items else Decimal('0')
+    item_count = sum(item.quantity for item in items)
+    if (cart.item_count, cart.total) != (item_count, total):
+        # Stored totals drifted (e.g. a service price changed) - resync the denormalized row.
+        cart.refresh_totals()
     return render(request, 'bookings/cart.html', {'cart': cart, 'items': items, 'total': total})
 
 
@@ -135,10 +171,7 @@ def add_to_cart_view(request, service_id):
     """Add a service to cart (quantity 1 or increment)."""
     service = get_object_or_404(Service, pk=service_id, is_active=True)
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    item, created = CartItem.objects.get_or_create(cart=cart, service=service, defaults={'quantity': 1})
-    if not created:
-        item.quantity += 1
-        item.save()
+    cart.add_service(service)
     messages.success(request, f'Added {service.name} to cart.')
     next_target = request.GET.get('next')
     if next_target == 'cart':
@@ -151,13 +184,87 @@ def add_to_cart_view(request, service_id):
 def remove_from_cart_view(request, service_id):
     """Remove a service from cart."""
     cart = get_object_or_404(Cart, user=request.user)
-    item = cart.items.filter(service_id=service_id).first()
-    if item:
-        item.delete()
+    if cart.remove_service(service_id):
         messages.success(request, 'Removed from cart.')
     return redirect('cart')
 
 
+def _cart_json(cart, service_id, quantity):
+    return JsonResponse({
+        'service_id': service_id,
+        'in_cart': quantity > 0,
+        'quantity': quantity,
+        'cart_item_count': cart.item_count,
+        'cart_total': str(cart.total),
+    })
+
+
+@login_required
+@require_POST
+def api_add_to_cart_view(request, service_id):
+    """JSON: add one unit of a service to the cart; returns the new quantity and cart totals."""
+    service = get_object_or_404(Service, pk=service_id, is_active=True)
+    cart, _ = Cart.objects.get_or_create(user=request.user)
+    quantity = cart.add_service(service)
+    return _cart_json(cart, service.pk, quantity)
+
+
+@login_required
+@require_POST
+def api_remove_from_cart_view(request, service_id):
+    """JSON: remove a service from the cart; returns the cart totals."""
+    cart, _ = Cart.objects.get_or_create(user=request.user)
+    cart.remove_service(service_id)
+    return _cart_json(cart, service_id, 0)
+
+
+@login_required
+def checkout_view(request):
+    """Book every item in the cart at once: one date/time (and optional staff) per unit, one payment."""
+    cart, _ = Cart.objects.get_or_create(user=request.user)
+    items = list(cart.items.select_related('service'))
+    if not items:
+        messages.info(request, 'Your cart is empty.')
+        return redirect('cart')
+    staff_list = list(Staff.objects.filter(is_active=True))
+    staff_by_id = {str(st.pk): st for st in staff_list}
+    # One row per unit: a cart item with quantity 2 needs two appointments.
+    rows = [
+        {
+            'key': f'{item.pk}-{n}',
+            'service': item.service,
+            'date': request.POST.get(f'date-{item.pk}-{n}', ''),
+            'time': request.POST.get(f'time-{item.pk}-{n}', ''),
+            'staff': request.POST.get(f'staff-{item.pk}-{n}', ''),
+        }
+        for item in items for n in range(item.quantity)
+    ]
+    context = {'rows': rows, 'staff_list': staff_list, 'total': cart.total_price()}
+
+    if request.method == 'POST':
+        slots = []
+        for row in rows:
+            try:
+                appt_date = datetime.strptime(row['date'], '%Y-%m-%d').date()
+                appt_time = datetime.strptime(row['time'], '%H:%M').time()
+            except ValueError:
+                messages.error(request, f'Please select a valid date and time for {row["service"].name}.')
+                return render(request, 'bookings/checkout.html', context)
+            if appt_date < date.today():
+                messages.error(request, f'Cannot book {row["service"].name} in the past.')
+                return render(request, 'bookings/checkout.html', context)
+            slots.append(CheckoutSlot(row['service'], appt_date, appt_time, staff=staff_by_id.get(row['staff'])))
+        try:
+            cart_payment = checkout_cart(request.user, cart, slots)
+        except SlotTaken as exc:
+            messages.error(request, str(exc))
+            return render(request, 'bookings/checkout.html', context)
+        messages.success(request, f'{len(slots)} appointments booked! Proceed to payment.')
+        return redirect('cart_payment', cart_payment.id)
+
+    return render(request, 'bookings/checkout.html', context)
+
+
 # ---------- Favourites (saved list, add, remove) ----------
 @login_required
 def saved_list_view(request):
@@ -186,3 +293,28 @@ def remove_from_favourites_view(request, service_id):
     messages.success(request, 'Removed from saved list.')
     ref = request.META.get('HTTP_REFERER')
     return redirect(ref if ref else 'saved_list')
+
+
+def _favourites_json(request, service_id, saved):
+    return JsonResponse({
+        'service_id': service_id,
+        'saved': saved,
+        'favourite_count': UserFavourite.objects.filter(user=request.user).count(),
+    })
+
+
+@login_required
+@require_POST
+def api_add_to_favourites_view(request, service_id):
+    """JSON: save a service (idempotent - the unique constraint makes get_or_create race-safe)."""
+    service = get_object_or_404(Service, pk=service_id, is_active=True)
+    UserFavourite.objects.get_or_create(user=request.user, service=service)
+    return _favourites_json(request, service.pk, True)
+
+
+@login_required
+@require_POST
+def api_remove_from_favourites_view(request, service_id):
+    """JSON: remove a service from the saved list."""
+    UserFavourite.objects.filter(user=request.user, service_id=service_id).delete()
+    return _favourites_json(request, service_id, False)
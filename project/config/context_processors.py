@@ -2,6 +2,8 @@
 Template context: default image and video URLs (replacing emojis with real media).
 Use these in templates via {{ default_images.hero }} etc.
 """
+from django.utils.functional import SimpleLazyObject
+
 # Free-to-use Unsplash images (beauty/salon relevant). Replace with your own static files if needed.
 DEFAULT_IMAGES = {
     'hero': 'https://images.unsplash.com/photo-1560066984-138dadb4c035?w=600&q=80',  # salon
@@ -33,20 +35,16 @@ def default_media(request):
 
 
 def user_cart_favourites(request):
-    """Expose user's cart service IDs and favourite service IDs for templates (users only)."""
+    """
+    Expose user's cart service IDs and favourite service IDs for templates (users only).
+    Lazy: nothing is loaded unless a template uses them, and then it comes from the per-user
+    cache in bookings.user_state (invalidated when cart items / favourites change).
+    """
     if not getattr(request, 'user', None) or not request.user.is_authenticated:
-        return {'user_cart_service_ids': set(), 'user_favourite_service_ids': set()}
-    from bookings.models import Cart, UserFavourite
-    cart_service_ids = set()
-    try:
-        cart = Cart.objects.get(user=request.user)
-        cart_service_ids = set(cart.items.values_list('service_id', flat=True))
-    except Cart.DoesNotExist:
-        pass
-    favourite_ids = set(
-        UserFavourite.objects.filter(user=request.user).values_list('service_id', flat=True)
-    )
+        return {'user_cart_service_ids': frozenset(), 'user_favourite_service_ids': frozenset()}
+    from bookings.user_state import cart_service_ids, favourite_service_ids
+    user_id = request.user.id
     return {
-        'user_cart_service_ids': cart_service_ids,
-        'user_favourite_service_ids': favourite_ids,
+        'user_cart_service_ids': SimpleLazyObject(lambda: cart_service_ids(user_id)),
+        'user_favourite_service_ids': SimpleLazyObject(lambda: favourite_service_ids(user_id)),
     }
@@ -0,0 +1,104 @@
+"""
+Full-page cache with conditional GET for pages that look the same to every anonymous visitor
+(about, FAQ, privacy, terms, team).
+Anonymous GET/HEAD requests are answered from the cache - no context processors, no template
+rendering - with a strong ETag (hash of the HTML) and Last-Modified, and a matching
+If-None-Match / If-Modified-Since gets a 304 with no body. Logged-in users, query strings and
+visitors with pending flash messages always get a freshly rendered page.
+A page whose content depends on data passes a `version` callable (e.g. the catalog version for
+the team page); a new version is a new cache key, so the old copy and its ETag simply expire.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+PAGE_CACHE_SECONDS = 60 * 60
+
+# Pass {'csrf_token': CSRF_PLACEHOLDER} to a cached page's template: the cached HTML keeps the
+# placeholder and each response gets the visitor's own token swapped in.
+CSRF_PLACEHOLDER = 'PAGECACHECSRFTOKENPLACEHOLDER'
+_CSRF_PLACEHOLDER_BYTES = CSRF_PLACEHOLDER.encode()
+
+
+def _cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.GET
+        and not request.user.is_authenticated
+        and not len(get_messages(request))  # len() loads messages without marking them read
+    )
+
+
+def _with_csrf_token(request, content):
+    if _CSRF_PLACEHOLDER_BYTES not in content:
+        return content
+    return content.replace(_CSRF_PLACEHOLDER_BYTES, get_token(request).encode())
+
+
+def _render_entry(view, request, args, kwargs):
+    """Render the page and return the cache entry for it, or (None, response) if not cacheable."""
+    response = view(request, *args, **kwargs)
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None, response
+    content = response.content
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'digest': hashlib.sha256(content).hexdigest()[:32],
+        'last_modified': int(time.time()),
+        'has_csrf': _CSRF_PLACEHOLDER_BYTES in content,
+    }, response
+
+
+def anonymous_page_cache(version=None):
+    """
+    View decorator: serve anonymous visitors from the page cache, with ETag/Last-Modified and 304s.
+    `version` is an optional callable returning the version of the data the page shows.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                response = view(request, *args, **kwargs)
+                if not response.streaming:
+                    response.content = _with_csrf_token(request, response.content)
+                return response
+
+            key = f"page:{request.path}:{version() if version else ''}"
+            entry = cache.get(key)
+            if entry is None:
+                entry, response = _render_entry(view, request, args, kwargs)
+                if entry is None:
+                    return response
+                cache.set(key, entry, PAGE_CACHE_SECONDS)
+
+            if entry['has_csrf']:
+                # The page embeds the visitor's CSRF token, so a cached copy is only still valid
+                # for the same CSRF cookie - fold it into the ETag and skip date-based validation.
+                cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+                digest = hashlib.sha256(f"{entry['digest']}:{cookie}".encode()).hexdigest()[:32]
+                last_modified = None
+            else:
+                digest, last_modified = entry['digest'], entry['last_modified']
+            etag = f'"{digest}"'
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = HttpResponse(
+                    _with_csrf_token(request, entry['content']), content_type=entry['content_type'],
+                )
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = http_date(entry['last_modified'])
+            patch_cache_control(response, max_age=0, must_revalidate=True)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
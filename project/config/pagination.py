@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination - fetch "the rows after the last one shown" instead of using OFFSET,
+so page 50 costs the same as page 1 when the ordering is backed by an index.
+The cursor is the ordering values of the last row on the page, as an opaque URL-safe string.
+"""
+import base64
+import json
+from bisect import bisect_right
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of rows plus the cursor for the next page (None on the last page)."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _field_name(order):
+    return order.lstrip('-')
+
+
+def _encode_values(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_values(cursor):
+    """Cursor string -> list of JSON values, or None if it is not a cursor we produced."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def encode_cursor(obj, ordering):
+    values = []
+    for order in ordering:
+        value = getattr(obj, _field_name(order))
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+    return _encode_values(values)
+
+
+def decode_cursor(cursor, model, ordering):
+    """Cursor string -> list of Python values for the ordering fields, or None if invalid."""
+    values = _decode_values(cursor)
+    if values is None or len(values) != len(ordering):
+        return None
+    try:
+        return [
+            model._meta.get_field(_field_name(order)).to_python(value)
+            for order, value in zip(ordering, values)
+        ]
+    except Exception:
+        return None
+
+
+def _after(ordering, values):
+    """Q for rows strictly after `values` in `ordering` (lexicographic over the fields)."""
+    condition = Q()
+    for i, order in enumerate(ordering):
+        name = _field_name(order)
+        lookup = 'lt' if order.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[i]})
+        for prev_order, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{_field_name(prev_order): prev_value})
+        condition |= step
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=20):
+    """
+    Return a KeysetPage of `queryset` ordered by `ordering` (e.g. ['-date', '-time', '-id']).
+    The last ordering field must be unique (normally the primary key). An invalid cursor
+    is treated as "first page".
+    """
+    ordering = list(ordering)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        if values is not None:
+            queryset = queryset.filter(_after(ordering, values))
+    rows = list(queryset[:per_page + 1])
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1], ordering) if len(rows) > per_page else None
+    return KeysetPage(items, next_cursor)
+
+
+def paginate_sorted(items, key, cursor=None, per_page=20):
+    """
+    Keyset-paginate an in-memory sequence (e.g. the catalog snapshot) already sorted ascending
+    by `key(item)` - a tuple of JSON-serialisable values whose last element is unique.
+    The page start is found by binary search, so deep pages cost the same as the first.
+    """
+    start = 0
+    if cursor:
+        values = _decode_values(cursor)
+        if values is not None:
+            try:
+                start = bisect_right(items, tuple(values), key=key)
+            except TypeError:
+                start = 0  # Cursor values of the wrong type - treat as "first page".
+    page = list(items[start:start + per_page])
+    next_cursor = _encode_values(key(page[-1])) if start + per_page < len(items) else None
+    return KeysetPage(page, next_cursor)
@@ -75,6 +75,43 @@ DATABASES = {
     }
 }
 
+# Cache for slot grids, cart/favourite id sets etc. Local memory is per process: when running
+# several worker processes use a shared backend (e.g. Redis/Memcached) so invalidations reach all.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'beauty-parlour',
+    }
+}
+
+# Contact form and feedback submissions are appended to a spool file and inserted in batches
+# (services/writebehind.py), so they do not take the SQLite write lock on every request.
+WRITE_BEHIND = {
+    'SPOOL_DIR': BASE_DIR / 'spool',
+    'MAX_ITEMS': 50,          # flush when this many submissions are waiting...
+    'MAX_DELAY_SECONDS': 5,   # ...or this long after the first one
+}
+
+# Local stand-in payment gateway (payments/gateway.py) for online payments. It answers after a
+# random latency, fails FAILURE_RATE of charges, and reports back through a signed webhook.
+# WEBHOOK_DELIVERY 'local' hands the webhook to the receiver in-process; 'http' POSTs it to
+# WEBHOOK_URL (the payment_webhook endpoint of a running server), like a real gateway.
+PAYMENT_GATEWAY = {
+    'LATENCY_MS': (300, 1500),
+    'FAILURE_RATE': float(os.environ.get('PAYMENT_GATEWAY_FAILURE_RATE', '0.1')),
+    'GATEWAY_THREADS': 8,
+    'WEBHOOK_SECRET': os.environ.get('PAYMENT_WEBHOOK_SECRET', 'dev-payment-webhook-secret'),
+    'WEBHOOK_DELIVERY': os.environ.get('PAYMENT_WEBHOOK_DELIVERY', 'local'),
+    'WEBHOOK_URL': os.environ.get('PAYMENT_WEBHOOK_URL', 'http://127.0.0.1:8000/payments/webhook/'),
+    'WEBHOOK_TOLERANCE_SECONDS': 300,  # reject webhooks signed longer ago (replays)
+    'WEBHOOK_WORKERS': 4,              # threads applying webhook events to Payment / Appointment
+    'WEBHOOK_QUEUE_SIZE': 1000,        # events waiting for a worker; beyond this the endpoint answers 503
+    'TIMEOUT_SECONDS': 120,            # a pending attempt older than this no longer blocks a new one
+}
+
+# Node part of pay_ transaction IDs (payments/ids.py): 0-1295, a different value on each server.
+PAYMENT_ID_NODE = int(os.environ.get('PAYMENT_ID_NODE', '0'))
+
 # Relaxed password validation for college demo - allow simple passwords (e.g. 123456, muskan, abc123)
 # Not for production use.
 AUTH_PASSWORD_VALIDATORS = []
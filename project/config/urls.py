@@ -2,9 +2,10 @@
 Main URL configuration. All routes point to app urls.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from services.views import page_not_found
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -18,5 +19,9 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
+# Catch-all: show custom 404 even when DEBUG=True (Django otherwise shows debug 404 page).
+# Must come after every app include, otherwise it swallows their URLs.
+urlpatterns += [re_path(r'^.+$', page_not_found)]
+
 # Custom 404 handler - must be in root urlconf
 handler404 = 'services.views.page_not_found'
@@ -0,0 +1,159 @@
+"""
+Streaming CSV / JSONL exports of payments and appointments for the admin panel.
+Rows are read with values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE) - the related
+columns come from the same JOINed query, as with select_related, but without building model
+instances - and written out in small batches, so memory stays flat whatever the row count.
+Filters: ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD (inclusive) and ?status=, with ?format=csv
+(default) or jsonl.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from bookings.models import Appointment
+from payments.models import Payment
+
+EXPORT_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500  # rows joined into one chunk of the response
+FORMATS = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson'}
+
+
+class ExportError(ValueError):
+    """Bad filter or format in the export query string (answered with 400)."""
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can build strings."""
+
+    def write(self, value):
+        return value
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f'{name} must be a date (YYYY-MM-DD).')
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _filters(params, status_choices):
+    date_from = _parse_date(params.get('date_from'), 'date_from')
+    date_to = _parse_date(params.get('date_to'), 'date_to')
+    status = params.get('status') or None
+    if status is not None and status not in dict(status_choices):
+        raise ExportError(f'status must be one of: {", ".join(dict(status_choices))}.')
+    return date_from, date_to, status
+
+
+def payment_rows(params):
+    """(columns, queryset of value tuples) for the payments export, newest first."""
+    date_from, date_to, status = _filters(params, Payment.STATUS_CHOICES)
+    payments = Payment.objects.order_by('-created_at')
+    if date_from:
+        payments = payments.filter(created_at__gte=_start_of(date_from))
+    if date_to:
+        payments = payments.filter(created_at__lt=_start_of(date_to + timedelta(days=1)))
+    if status:
+        payments = payments.filter(status=status)
+    columns = (
+        'id', 'created_at', 'amount', 'method', 'status', 'transaction_id', 'appointment_id',
+        'appointment_date', 'service', 'branch', 'username', 'cart_payment_id',
+    )
+    return columns, payments.values_list(
+        'pk', 'created_at', 'amount', 'method', 'status', 'transaction_id', 'appointment_id',
+        'appointment__date', 'appointment__service__name', 'appointment__service__location',
+        'appointment__user__username', 'cart_payment_id',
+    )
+
+
+def appointment_rows(params):
+    """(columns, queryset of value tuples) for the appointments export, latest date first."""
+    date_from, date_to, status = _filters(params, Appointment.STATUS_CHOICES)
+    appointments = Appointment.objects.order_by('-date', '-time')
+    if date_from:
+        appointments = appointments.filter(date__gte=date_from)
+    if date_to:
+        appointments = appointments.filter(date__lte=date_to)
+    if status:
+        appointments = appointments.filter(status=status)
+    columns = (
+        'id', 'date', 'time', 'status', 'username', 'email', 'service', 'branch', 'price', 'staff',
+        'created_at', 'notes',
+    )
+    return columns, appointments.values_list(
+        'pk', 'date', 'time', 'status', 'user__username', 'user__email', 'service__name',
+        'service__location', 'service__price', 'staff__name', 'created_at', 'notes',
+    )
+
+
+EXPORTS = {'payments': payment_rows, 'appointments': appointment_rows}
+
+
+def _value(value, tz):
+    kind = type(value)
+    if kind is str or kind is int:
+        return value
+    if value is None:
+        return ''
+    if kind is datetime:
+        return value.astimezone(tz).isoformat(timespec='seconds')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_cell(value, tz):
+    """Text starting like a formula (e.g. '=cmd|...' in notes) is prefixed with ' for spreadsheets."""
+    value = _value(value, tz)
+    if type(value) is str and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def stream(columns, rows, fmt):
+    """Generator of response chunks for the rows (a values_list queryset) in `fmt`."""
+    rows = rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    tz = timezone.get_current_timezone()
+    if fmt == 'jsonl':
+        lines = (
+            json.dumps({c: _value(v, tz) for c, v in zip(columns, row)}, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+        return _batched(lines)
+    writer = csv.writer(_Echo())
+    header = writer.writerow(columns)
+    return _batched(_prepend(header, (writer.writerow([_csv_cell(v, tz) for v in row]) for row in rows)))
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+def export(kind, params):
+    """(content type, filename, chunks) for /admin_panel/<kind>/export/. Raises ExportError."""
+    fmt = params.get('format') or 'csv'
+    if fmt not in FORMATS:
+        raise ExportError(f'format must be one of: {", ".join(FORMATS)}.')
+    columns, rows = EXPORTS[kind](params)
+    filename = f'{kind}-{timezone.localdate():%Y%m%d}.{fmt}'
+    return FORMATS[fmt], filename, stream(columns, rows, fmt)
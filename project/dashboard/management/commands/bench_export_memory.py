@@ -0,0 +1,99 @@
+"""
+Memory check for the admin panel exports (dashboard/exports.py): create many synthetic
+appointments and payments, download each export through the export view and check that the
+peak Python memory while streaming stays under a fixed budget, whatever the row count.
+The synthetic rows are created inside a transaction that is rolled back.
+Run: python manage.py bench_export_memory --rows 1000000 --budget-mb 32
+"""
+import time as timer
+import tracemalloc
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from bookings.models import Appointment
+from payments.models import Payment
+from services.models import Service
+
+BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = 'Export many synthetic payments / appointments and check streaming memory stays within a budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Synthetic appointments (and payments)')
+        parser.add_argument('--budget-mb', type=float, default=32, help='Allowed peak Python memory per export')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            results = self._run(options['rows'])
+            transaction.set_rollback(True)
+        budget = options['budget_mb']
+        over = False
+        for label, rows, size, seconds, peak in results:
+            over |= peak > budget
+            self.stdout.write(
+                f'  {label:20} {rows:>9} rows  {size / 2 ** 20:8.1f} MB  {seconds:6.1f}s  '
+                f'{rows / seconds:>9,.0f} rows/s  peak {peak:6.1f} MB'
+            )
+        if over:
+            raise CommandError(f'An export used more than {budget} MB.')
+        self.stdout.write(self.style.SUCCESS(f'OK - every export stayed under {budget} MB.'))
+
+    def _run(self, n):
+        t0 = timer.perf_counter()
+        user = User.objects.create_user(username='export_bench_user', email='bench@example.com')
+        service = Service.objects.create(name='Export Bench Service', price=799, location='Bandra', is_active=False)
+        start = date.today() - timedelta(days=365)
+        for offset in range(0, n, BATCH):
+            # 'completed' rows are outside the one-active-booking-per-slot constraints.
+            appointments = Appointment.objects.bulk_create([
+                Appointment(
+                    user=user, service=service, status='completed', notes='Synthetic export row',
+                    date=start + timedelta(days=i % 365), time=time(9 + i % 10, 0),
+                )
+                for i in range(offset, min(offset + BATCH, n))
+            ])
+            Payment.objects.bulk_create([
+                Payment(
+                    appointment=appointment, amount=799, method='online', status='paid',
+                    transaction_id=f'pay_bench{appointment.pk:013d}',
+                )
+                for appointment in appointments
+            ])
+        self.stdout.write(f'{n} appointments + payments created in {timer.perf_counter() - t0:.1f}s')
+
+        client = Client(HTTP_HOST='localhost')
+        session = client.session
+        session['admin_panel_logged_in'] = True
+        session.save()
+        results = []
+        tracemalloc.start()
+        try:
+            for kind in ('payments', 'appointments'):
+                for fmt in ('csv', 'jsonl'):
+                    results.append(self._export(client, kind, fmt))
+        finally:
+            tracemalloc.stop()
+        return results
+
+    def _export(self, client, kind, fmt):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        t0 = timer.perf_counter()
+        response = client.get(reverse(f'export_{kind}'), {'format': fmt})
+        if response.status_code != 200:
+            raise CommandError(f'{kind} export answered {response.status_code}')
+        size = lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        seconds = timer.perf_counter() - t0
+        peak = (tracemalloc.get_traced_memory()[1] - baseline) / 2 ** 20
+        rows = lines - 1 if fmt == 'csv' else lines  # CSV has a header line
+        return f'{kind} {fmt}', rows, size, seconds, peak
@@ -0,0 +1,81 @@
+"""
+Benchmark location suggestions (dashboard location_suggestions_view) with many services:
+the old icontains + DISTINCT query against the in-memory index in services/locations.py.
+Synthetic services are created inside a transaction that is rolled back.
+Run: python manage.py bench_location_suggestions --services 50000
+"""
+import random
+import statistics
+import time as timer
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.locations import LocationIndex, SUGGESTION_LIMIT, reset_index
+from services.models import Service
+
+AREAS = [
+    'Andheri', 'Bandra', 'Borivali', 'Chembur', 'Colaba', 'Dadar', 'Ghatkopar', 'Goregaon', 'Juhu',
+    'Kandivali', 'Khar', 'Kurla', 'Malad', 'Mulund', 'Powai', 'Santacruz', 'Sion', 'Thane', 'Vashi',
+    'Vikhroli', 'Worli',
+]
+SUFFIXES = ['', ' East', ' West', ' Station Road', ' Market', ' Link Road', ' Junction']
+
+
+def _percentile(samples, p):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark location suggestion latency: DB query vs in-memory index (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=50000, help='Synthetic services to create')
+        parser.add_argument('--lookups', type=int, default=2000, help='Suggestion lookups per method')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options['services'], options['lookups'])
+            transaction.set_rollback(True)
+        reset_index()
+
+    def _run(self, n_services, n_lookups):
+        rnd = random.Random(42)
+        locations = [f'{area}{suffix}' for area in AREAS for suffix in SUFFIXES]
+        Service.objects.bulk_create([
+            Service(name=f'Bench Service {i}', price=100, location=rnd.choice(locations))
+            for i in range(n_services)
+        ], batch_size=2000)
+        # What a user types, one debounced keystroke at a time, plus some mid-word queries.
+        queries = [loc[:rnd.randint(1, 6)].lower() for loc in rnd.choices(locations, k=n_lookups)]
+        queries += [rnd.choice(['west', 'road', 'ar', 'station', 'xyz']) for _ in range(n_lookups // 4)]
+        self.stdout.write(f'{n_services} services, {len(locations)} distinct locations, {len(queries)} lookups')
+
+        t0 = timer.perf_counter()
+        index = LocationIndex('bench', Service.objects.exclude(location='').values_list('pk', 'location'))
+        self.stdout.write(f'  index build (one query):  {(timer.perf_counter() - t0) * 1000:9.2f} ms')
+
+        def timed(fn):
+            samples = []
+            for q in queries:
+                t = timer.perf_counter()
+                fn(q)
+                samples.append((timer.perf_counter() - t) * 1e6)
+            return samples
+
+        db = timed(lambda q: list(
+            Service.objects.filter(location__icontains=q).exclude(location='')
+            .values_list('location', flat=True).distinct()[:SUGGESTION_LIMIT]
+        ))
+        mem = timed(lambda q: index.suggest(q))
+        for label, samples in (('icontains + DISTINCT', db), ('in-memory index', mem)):
+            self.stdout.write(
+                f'  {label:22} mean {statistics.mean(samples):9.1f} us   '
+                f'p95 {_percentile(samples, 0.95):9.1f} us'
+            )
+        self.stdout.write(f'  speed-up (mean): {statistics.mean(db) / statistics.mean(mem):.0f}x')
+
+        t0 = timer.perf_counter()
+        for i in range(1000):
+            index.set_location(-i - 1, rnd.choice(locations) + ' New')
+        self.stdout.write(f'  incremental update:       {(timer.perf_counter() - t0) * 1000:9.2f} us / save')
@@ -0,0 +1,93 @@
+"""
+Run EXPLAIN QUERY PLAN (SQLite) for the queries behind the busiest views and flag full table
+scans or sorts that no index covers. Exits with an error if any are found, so it can run in CI.
+Run: python manage.py explain_hot_queries
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from bookings.availability import ACTIVE_STATUSES, DaySchedule
+from bookings.models import Appointment, CartItem, UserFavourite
+from dashboard.exports import appointment_rows, payment_rows
+from payments.models import Payment
+from services.models import Feedback
+
+# Placeholder ids/dates - the plan depends on the query shape, not on the values.
+SAMPLE_USER_ID = 1
+SAMPLE_STAFF_ID = 1
+SAMPLE_CART_ID = 1
+SAMPLE_EXPORT_RANGE = {'date_from': '2026-01-01', 'date_to': '2026-01-31'}
+
+
+def hot_queries():
+    """(label, queryset) pairs mirroring the hot views."""
+    today = date.today()
+    mine = Appointment.objects.filter(user_id=SAMPLE_USER_ID).select_related('service', 'staff', 'payment')
+    is_upcoming = Q(status__in=ACTIVE_STATUSES, date__gte=today)
+    return [
+        ('booking_view: clash check (staff + user, one day)',
+         DaySchedule.day_queryset(today, staff=SAMPLE_STAFF_ID, user=SAMPLE_USER_ID)),
+        ('booking_slots_view: staff grid (one day)',
+         DaySchedule.day_queryset(today, staff=SAMPLE_STAFF_ID)),
+        ('my_appointments_view: upcoming',
+         mine.filter(is_upcoming).order_by('-date', '-time')),
+        ('my_appointments_view: history page',
+         mine.exclude(is_upcoming).order_by('-date', '-time', '-id')[:21]),
+        ('complete_past_appointments: chunk',
+         Appointment.objects.filter(status='confirmed', date__lte=today).order_by('date', 'id')
+         .values_list('id', 'date', 'time', 'staff_id', 'service__duration_minutes')[:500]),
+        ('manage_appointments_view',
+         Appointment.objects.select_related('user', 'service', 'staff').order_by('-date', '-time')),
+        ('manage_payments_view',
+         Payment.objects.select_related('appointment__service', 'appointment__user').order_by('-created_at')),
+        ('export_view: payments', payment_rows({})[1]),
+        ('export_view: payments (date range)', payment_rows(SAMPLE_EXPORT_RANGE)[1]),
+        ('export_view: appointments', appointment_rows({})[1]),
+        ('export_view: appointments (date range)', appointment_rows(SAMPLE_EXPORT_RANGE)[1]),
+        ('saved_list_view',
+         UserFavourite.objects.filter(user_id=SAMPLE_USER_ID).select_related('service').order_by('-created_at')),
+        ('user_cart_favourites: favourite ids',
+         UserFavourite.objects.filter(user_id=SAMPLE_USER_ID).values_list('service_id', flat=True)),
+        ('testimonials_view: page',
+         Feedback.objects.select_related('user').order_by('-created_at', '-id')[:10]),
+        ('user_cart_favourites: cart ids',
+         CartItem.objects.filter(cart_id=SAMPLE_CART_ID).values_list('service_id', flat=True)),
+    ]
+
+
+def problems_in_plan(plan_rows):
+    """Plan lines that mean a full scan ("SCAN table" without an index) or an un-indexed sort."""
+    problems = []
+    for row in plan_rows:
+        detail = row[-1]
+        if detail.startswith('SCAN ') and 'USING' not in detail and 'CONSTANT ROW' not in detail:
+            problems.append(detail)
+        elif 'USE TEMP B-TREE' in detail:
+            problems.append(detail)
+    return problems
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN QUERY PLAN for hot view queries; fails if any does a full scan or un-indexed sort.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('explain_hot_queries only understands SQLite query plans.')
+        flagged = 0
+        for label, qs in hot_queries():
+            sql, params = qs.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = cursor.fetchall()
+            problems = problems_in_plan(plan)
+            status = self.style.ERROR('FULL SCAN') if problems else self.style.SUCCESS('ok')
+            self.stdout.write(f'{status}  {label}')
+            for row in plan:
+                self.stdout.write(f'      {row[-1]}')
+            flagged += bool(problems)
+        if flagged:
+            raise CommandError(f'{flagged} hot queries are not fully index-backed.')
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes.'))
@@ -15,6 +15,8 @@ urlpatterns = [
     path('staff/<int:pk>/edit/', views.staff_edit_view, name='staff_edit'),
     path('staff/<int:pk>/delete/', views.staff_delete_view, name='staff_delete'),
     path('appointments/', views.manage_appointments_view, name='manage_appointments'),
+    path('appointments/export/', views.export_view, {'kind': 'appointments'}, name='export_appointments'),
     path('appointments/<int:pk>/delete/', views.appointment_delete_view, name='appointment_delete'),
     path('payments/', views.manage_payments_view, name='manage_payments'),
+    path('payments/export/', views.export_view, {'kind': 'payments'}, name='export_payments'),
 ]
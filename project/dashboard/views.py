@@ -3,14 +3,23 @@ Custom Admin Panel - separate from Django Admin.
 Login via ADMIN_PANEL_USERNAME and ADMIN_PANEL_PASSWORD from .env (read in settings).
 Session-based; no Django superuser.
 """
+import hashlib
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.conf import settings
 from django.contrib.auth.models import User
 from services.models import Service, Staff
+from services.locations import locations_version, suggest_locations
 from bookings.models import Appointment
+from payments.ledger import revenue_summary
+from .exports import ExportError, export
 from payments.models import Payment
 
+# Browsers may reuse a suggestion list this long without asking again.
+LOCATION_SUGGESTIONS_MAX_AGE = 30
+
 
 def _panel_logged_in(request):
     """Check if custom admin panel session is active."""
@@ -55,12 +64,13 @@ def dashboard_home_view(request):
     total_users = User.objects.count()
     total_bookings = Appointment.objects.count()
     total_services = Service.objects.filter(is_active=True).count()
-    total_payments = Payment.objects.filter(status='paid').count()
+    revenue = revenue_summary()  # From the daily ledger - a few rows, not every payment.
     return render(request, 'dashboard/dashboard_home.html', {
         'total_users': total_users,
         'total_bookings': total_bookings,
         'total_services': total_services,
-        'total_payments': total_payments,
+        'total_payments': revenue['count'],
+        'revenue': revenue,
     })
 
 
@@ -115,17 +125,21 @@ def service_edit_view(request, pk):
 
 @_require_panel
 def location_suggestions_view(request):
-    """JSON API: suggest locations (from existing services) matching query. Used with debounce."""
+    """
+    JSON API: suggest locations (from existing services) matching query. Used with debounce.
+    Served from the in-memory index in services/locations.py - prefix matches first, then
+    substring matches. The ETag follows the index version, so repeat keystrokes get a 304.
+    """
     q = (request.GET.get('q') or '').strip()[:50]
     if not q:
         return JsonResponse({'locations': []})
-    locations = list(
-        Service.objects.filter(location__icontains=q)
-        .exclude(location='')
-        .values_list('location', flat=True)
-        .distinct()[:15]
-    )
-    return JsonResponse({'locations': locations})
+    etag = '"%s"' % hashlib.md5(f'{locations_version()}:{q.casefold()}'.encode()).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({'locations': suggest_locations(q)})
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=LOCATION_SUGGESTIONS_MAX_AGE)
+    return response
 
 
 @_require_panel
@@ -194,7 +208,10 @@ def staff_delete_view(request, pk):
 @_require_panel
 def manage_appointments_view(request):
     appointments = Appointment.objects.select_related('user', 'service', 'staff').order_by('-date', '-time')
-    return render(request, 'dashboard/manage_appointments.html', {'appointments': appointments})
+    return render(request, 'dashboard/manage_appointments.html', {
+        'appointments': appointments,
+        'status_choices': Appointment.STATUS_CHOICES,
+    })
 
 
 @_require_panel
@@ -213,5 +230,23 @@ def appointment_delete_view(request, pk):
 # --- Payments list ---
 @_require_panel
 def manage_payments_view(request):
-    payments = Payment.objects.select_related('appointment').order_by('-created_at')
-    return render(request, 'dashboard/manage_payments.html', {'payments': payments})
+    payments = Payment.objects.select_related(
+        'appointment__service', 'appointment__user',
+    ).order_by('-created_at')
+    return render(request, 'dashboard/manage_payments.html', {
+        'payments': payments,
+        'status_choices': Payment.STATUS_CHOICES,
+    })
+
+
+# --- CSV / JSONL exports (dashboard/exports.py) ---
+@_require_panel
+def export_view(request, kind):
+    """Stream every matching payment / appointment as CSV or JSONL - flat memory at any size."""
+    try:
+        content_type, filename, chunks = export(kind, request.GET)
+    except ExportError as exc:
+        return HttpResponseBadRequest(str(exc))
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, SavedPaymentMethod
+from .models import DailyRevenue, Payment, PaymentAttempt, SavedPaymentMethod
 
 
 @admin.register(Payment)
@@ -8,6 +8,19 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'method')
 
 
+@admin.register(PaymentAttempt)
+class PaymentAttemptAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'user', 'appointment', 'cart_payment', 'outcome', 'transaction_id', 'created_at')
+    list_filter = ('outcome',)
+
+
+@admin.register(DailyRevenue)
+class DailyRevenueAdmin(admin.ModelAdmin):
+    list_display = ('date', 'branch', 'method', 'status', 'count', 'amount')
+    list_filter = ('status', 'method', 'branch')
+    date_hierarchy = 'date'
+
+
 @admin.register(SavedPaymentMethod)
 class SavedPaymentMethodAdmin(admin.ModelAdmin):
     list_display = ('user', 'last_four', 'card_type', 'nickname', 'is_default')
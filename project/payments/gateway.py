@@ -0,0 +1,106 @@
+"""
+Local stand-in for the online payment gateway (Razorpay-style), for demos and load tests.
+charge() returns immediately; a gateway thread waits a random latency
+(settings.PAYMENT_GATEWAY['LATENCY_MS']), decides the outcome (FAILURE_RATE, or the test
+outcome picked on the demo payment form) and reports it with a signed webhook, as a real
+gateway would. Delivery is in-process ('local') or an HTTP POST to WEBHOOK_URL ('http').
+"""
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .ids import new_transaction_id
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-Gateway-Signature'
+TIMESTAMP_HEADER = 'X-Gateway-Timestamp'
+DELIVERY_ATTEMPTS = 3
+
+
+def sign(body, timestamp, secret=None):
+    """HMAC-SHA256 (hex) of '<timestamp>.<body>' with the shared webhook secret."""
+    secret = secret or settings.PAYMENT_GATEWAY['WEBHOOK_SECRET']
+    return hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+
+
+def _deliver_http(body, headers):
+    request = urllib.request.Request(
+        settings.PAYMENT_GATEWAY['WEBHOOK_URL'], data=body, method='POST',
+        headers={'Content-Type': 'application/json', **headers},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def _deliver_local(body, headers):
+    from .webhooks import receive_webhook
+    return receive_webhook(body, headers.get(TIMESTAMP_HEADER), headers.get(SIGNATURE_HEADER))
+
+
+def deliver(event):
+    """Sign and deliver one webhook event, retrying (with backoff) until it is accepted."""
+    body = json.dumps(event, separators=(',', ':')).encode()
+    timestamp = str(int(time.time()))
+    headers = {TIMESTAMP_HEADER: timestamp, SIGNATURE_HEADER: sign(body, timestamp)}
+    send = _deliver_http if settings.PAYMENT_GATEWAY['WEBHOOK_DELIVERY'] == 'http' else _deliver_local
+    for attempt in range(DELIVERY_ATTEMPTS):
+        try:
+            status = send(body, headers)
+        except (urllib.error.URLError, OSError) as exc:
+            status = getattr(exc, 'code', None)
+            if attempt == DELIVERY_ATTEMPTS - 1:
+                logger.error('Webhook delivery failed for %s: %r', event['attempt_id'], exc)
+        if status is not None and 200 <= status < 300:
+            return True
+        time.sleep(0.5 * 2 ** attempt)
+    return False
+
+
+class LocalGateway:
+    """Simulated gateway: a bounded pool of 'gateway' threads that settle charges."""
+
+    def __init__(self, latency_ms, failure_rate, threads):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='gateway')
+
+    def charge(self, attempt_id, amount, force_outcome=None):
+        """Accept a charge and return at once; the webhook follows after the simulated latency."""
+        return self._pool.submit(self._settle, attempt_id, str(amount), force_outcome)
+
+    def _settle(self, attempt_id, amount, force_outcome):
+        time.sleep(random.uniform(*self.latency_ms) / 1000)
+        if force_outcome is None:
+            succeeded = random.random() >= self.failure_rate
+        else:
+            succeeded = force_outcome
+        deliver({
+            'event': 'payment.captured' if succeeded else 'payment.failed',
+            'attempt_id': attempt_id,
+            'amount': amount,
+            'transaction_id': new_transaction_id() if succeeded else '',
+        })
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                conf = settings.PAYMENT_GATEWAY
+                _gateway = LocalGateway(conf['LATENCY_MS'], conf['FAILURE_RATE'], conf['GATEWAY_THREADS'])
+    return _gateway
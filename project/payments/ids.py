@@ -0,0 +1,105 @@
+"""
+Transaction IDs - pay_ + 18 base36 characters, unique by construction and ordered by time:
+  8 chars  milliseconds since the Unix epoch (good until 2059)
+  2 chars  node, settings.PAYMENT_ID_NODE (0-1295) - give each server its own
+  5 chars  process ID (below 36^5 on any Linux pid_max)
+  3 chars  per-process sequence within the millisecond (46656 IDs/ms; then wait for the next)
+Two live processes on one node never share a PID, and a process only issues IDs for
+milliseconds after it started, so a later process that reuses a PID cannot repeat an ID.
+Fixed width and 0-9 < a-z in ASCII make string order equal time order, so an index on
+transaction_id also serves time ranges (transaction_id_bounds).
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+
+PREFIX = 'pay_'
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+TIME_WIDTH, NODE_WIDTH, PID_WIDTH, SEQ_WIDTH = 8, 2, 5, 3
+SEQ_MAX = 36 ** SEQ_WIDTH - 1
+_PAIRS = [a + b for a in ALPHABET for b in ALPHABET]  # 2-digit base36 strings, for the sequence
+
+
+def _base36(value, width):
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, 36)
+        digits.append(ALPHABET[digit])
+    if value:
+        raise ValueError(f'{value} does not fit in {width} base36 digits')
+    return ''.join(reversed(digits))
+
+
+def _now_ms():
+    return time.time_ns() // 1_000_000
+
+
+class TransactionIdGenerator:
+    """Thread-safe generator for one process."""
+
+    def __init__(self, node, pid):
+        self._suffix = _base36(node, NODE_WIDTH) + _base36(pid, PID_WIDTH)
+        self._lock = threading.Lock()
+        # Treat the current millisecond as used up: a dead process with the same PID may have used it.
+        self._last_ms = _now_ms()
+        self._seq = SEQ_MAX
+        self._head = ''
+
+    def next_id(self):
+        with self._lock:
+            now = _now_ms()
+            if now > self._last_ms:
+                self._set_ms(now)
+            else:
+                self._seq += 1
+                if self._seq > SEQ_MAX:
+                    while now == self._last_ms:
+                        now = _now_ms()
+                    # max(): if the clock stepped back, keep counting forward from the last ID.
+                    self._set_ms(max(now, self._last_ms + 1))
+            seq = self._seq
+            return self._head + _PAIRS[seq // 36] + ALPHABET[seq % 36]
+
+    def _set_ms(self, ms):
+        """Start a new millisecond; the prefix is encoded once per millisecond, not per ID."""
+        self._last_ms, self._seq = ms, 0
+        self._head = PREFIX + _base36(ms, TIME_WIDTH) + self._suffix
+
+
+_generator = None
+_generator_pid = None
+_generator_lock = threading.Lock()
+
+
+def new_transaction_id():
+    """A new pay_ transaction ID from this process's generator (a forked worker gets its own)."""
+    global _generator, _generator_pid
+    pid = os.getpid()
+    if _generator_pid != pid:
+        with _generator_lock:
+            if _generator_pid != pid:
+                _generator = TransactionIdGenerator(getattr(settings, 'PAYMENT_ID_NODE', 0), pid)
+                _generator_pid = pid
+    return _generator.next_id()
+
+
+def transaction_id_time(transaction_id):
+    """When an ID was issued (Unix seconds), or None for IDs in another format (older demo IDs)."""
+    if not transaction_id.startswith(PREFIX) or len(transaction_id) != len(PREFIX) + 18:
+        return None
+    try:
+        return int(transaction_id[len(PREFIX):len(PREFIX) + TIME_WIDTH], 36) / 1000
+    except ValueError:
+        return None
+
+
+def transaction_id_bounds(start, end):
+    """
+    (low, high) such that low <= transaction_id < high selects IDs issued in [start, end)
+    (aware datetimes). Older 14-character demo IDs are not time-ordered and may also match.
+    """
+    return tuple(
+        PREFIX + _base36(int(moment.timestamp() * 1000), TIME_WIDTH) for moment in (start, end)
+    )
@@ -0,0 +1,152 @@
+"""
+Daily revenue ledger - DailyRevenue rows keyed by (day the Payment was created, method,
+status, branch) with the count and amount of paid / failed payments.
+Every change is applied in the transaction that writes the Payment, as +/- deltas with F()
+expressions: the old bucket loses the row and the new one gains it. Payment.save() and
+deletes are covered by signals (payments/signals.py); code that changes payments with
+queryset.update() takes a snapshot() first and calls move() afterwards
+(payments/processing.py). The branch is the service's location when the row was counted, so
+Service.save() with a new location moves its payments over (rebranch); changing locations
+with queryset.update() or bulk imports need `manage.py rebuild_revenue_ledger`, which
+recomputes the ledger from Payment.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DailyRevenue, Payment
+
+TRACKED_STATUSES = ('paid', 'failed')
+# What a Payment contributes to the ledger: (created_at, method, status, amount, branch).
+LEDGER_FIELDS = ('created_at', 'method', 'status', 'amount', 'appointment__service__location')
+REBUILD_ATTEMPTS = 5
+
+
+def _key(created_at, method, status, branch):
+    return timezone.localdate(created_at), method, status, (branch or '').strip()
+
+
+def _new_changes():
+    return defaultdict(lambda: [0, Decimal('0')])
+
+
+def _add(changes, rows, delta):
+    for created_at, method, status, amount, branch in rows:
+        if status in TRACKED_STATUSES:
+            bucket = changes[_key(created_at, method, status, branch)]
+            bucket[0] += delta
+            bucket[1] += delta * amount
+
+
+def apply(changes):
+    """Add {(date, method, status, branch): [count, amount]} deltas to the ledger rows."""
+    for (day, method, status, branch), (count, amount) in changes.items():
+        if not count and not amount:
+            continue
+        row = DailyRevenue.objects.filter(date=day, method=method, status=status, branch=branch)
+        if row.update(count=F('count') + count, amount=F('amount') + amount):
+            continue
+        try:
+            with transaction.atomic():
+                DailyRevenue.objects.create(
+                    date=day, method=method, status=status, branch=branch, count=count, amount=amount,
+                )
+        except IntegrityError:
+            row.update(count=F('count') + count, amount=F('amount') + amount)  # Created meanwhile.
+
+
+def record(rows, delta=1):
+    """Count Payment rows (tuples of LEDGER_FIELDS) into the ledger, or out of it with delta=-1."""
+    changes = _new_changes()
+    _add(changes, rows, delta)
+    apply(changes)
+
+
+def rows(payments):
+    """The ledger view of a Payment queryset: a list of LEDGER_FIELDS tuples."""
+    return list(payments.values_list(*LEDGER_FIELDS))
+
+
+def snapshot(payments):
+    """rows(), locked - taken inside the transaction, before updating the payments."""
+    return rows(payments.select_for_update())
+
+
+def replace(before, after):
+    """Take the `before` rows out of the ledger and put the `after` rows in, in one go."""
+    changes = _new_changes()
+    _add(changes, before, -1)
+    _add(changes, after, 1)
+    apply(changes)
+
+
+def move(before, status, method, amount=None):
+    """Move rows captured by snapshot() to their new status / method (and amount, if changed)."""
+    replace(before, [
+        (created_at, method, status, old_amount if amount is None else amount, branch)
+        for created_at, _, _, old_amount, branch in before
+    ])
+
+
+def rebranch(service_id, old_location):
+    """Move a service's payments from its old branch to its current one (its location was edited)."""
+    after = rows(Payment.objects.filter(appointment__service_id=service_id, status__in=TRACKED_STATUSES))
+    replace([row[:4] + (old_location,) for row in after], after)
+
+
+def rebuild(chunk_size=5000):
+    """
+    Recompute every ledger row from Payment, reading it in primary-key chunks. The new rows
+    replace the old ones in the same transaction as the reads, so no concurrent payment is lost.
+    Returns (payments counted, ledger rows).
+    """
+    for attempt in range(REBUILD_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _rebuild(chunk_size)
+        except OperationalError:
+            if attempt == REBUILD_ATTEMPTS - 1:
+                raise
+            time.sleep(0.1 * (attempt + 1))  # SQLite "database is locked" - back off and retry.
+
+
+def _rebuild(chunk_size):
+    changes = _new_changes()
+    tracked = Payment.objects.filter(status__in=TRACKED_STATUSES).order_by('pk')
+    last_pk, counted = 0, 0
+    while True:
+        chunk = list(tracked.filter(pk__gt=last_pk).values_list('pk', *LEDGER_FIELDS)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        counted += len(chunk)
+        _add(changes, (row[1:] for row in chunk), 1)
+    DailyRevenue.objects.all().delete()
+    DailyRevenue.objects.bulk_create([
+        DailyRevenue(date=day, method=method, status=status, branch=branch, count=count, amount=amount)
+        for (day, method, status, branch), (count, amount) in changes.items() if count
+    ], batch_size=1000)
+    return counted, sum(1 for count, _ in changes.values() if count)
+
+
+def revenue_summary(days=14):
+    """Paid revenue for the dashboard: all-time totals, per day (last `days`) and per branch."""
+    paid = DailyRevenue.objects.filter(status='paid')
+    since = timezone.localdate() - timedelta(days=days - 1)
+    totals = paid.aggregate(count=Sum('count'), amount=Sum('amount'))
+    return {
+        'count': totals['count'] or 0,
+        'amount': totals['amount'] or Decimal('0'),
+        'by_day': list(
+            paid.filter(date__gte=since).values('date')
+            .annotate(count=Sum('count'), amount=Sum('amount')).order_by('-date')
+        ),
+        'by_branch': list(
+            paid.values('branch').annotate(count=Sum('count'), amount=Sum('amount')).order_by('-amount')
+        ),
+    }
@@ -0,0 +1,80 @@
+"""
+Benchmark and collision check for pay_ transaction IDs (payments/ids.py).
+Several forked processes (each with several threads) generate IDs as fast as they can and
+write them to temporary files; the files are then merged in sorted order to count duplicates
+without holding every ID in memory. Also checks that each process's IDs come out in order.
+Run: python manage.py bench_transaction_ids --processes 4 --ids 1000000
+"""
+import heapq
+import multiprocessing
+import tempfile
+import threading
+import time as timer
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.ids import new_transaction_id
+
+
+def _generate(path, count, threads):
+    """Child process: `threads` threads share `count` IDs; returns (seconds, ordered)."""
+    per_thread = [count // threads + (1 if i < count % threads else 0) for i in range(threads)]
+    results = [None] * threads
+
+    def run(i):
+        results[i] = [new_transaction_id() for _ in range(per_thread[i])]
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    t0 = timer.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = timer.perf_counter() - t0
+    ordered = all(all(a < b for a, b in zip(ids, ids[1:])) for ids in results)
+    with open(path, 'w') as f:
+        for line in heapq.merge(*results):
+            f.write(line + '\n')
+    return elapsed, ordered
+
+
+class Command(BaseCommand):
+    help = 'Generate millions of transaction IDs across processes and check there are no collisions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Forked generator processes')
+        parser.add_argument('--threads', type=int, default=2, help='Threads per process')
+        parser.add_argument('--ids', type=int, default=1000000, help='IDs per process')
+
+    def handle(self, *args, **options):
+        n_proc, n_threads, n_ids = options['processes'], options['threads'], options['ids']
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [str(Path(tmp) / f'ids-{i}.txt') for i in range(n_proc)]
+            with multiprocessing.get_context('fork').Pool(n_proc) as pool:
+                t0 = timer.perf_counter()
+                results = pool.starmap(_generate, [(p, n_ids, n_threads) for p in paths])
+                wall = timer.perf_counter() - t0
+            total, duplicates, previous = 0, 0, None
+            files = [open(p) for p in paths]
+            try:
+                for line in heapq.merge(*files):
+                    total += 1
+                    if line == previous:
+                        duplicates += 1
+                    previous = line
+            finally:
+                for f in files:
+                    f.close()
+
+        rates = [n_ids / seconds for seconds, _ in results]
+        self.stdout.write(f'{n_proc} processes x {n_threads} threads, {n_ids} IDs per process ({total} total)')
+        self.stdout.write(f'  per process: {min(rates):,.0f} - {max(rates):,.0f} IDs/s')
+        self.stdout.write(f'  combined:    {total / wall:,.0f} IDs/s (wall clock incl. writing files)')
+        self.stdout.write(f'  sample:      {previous.strip()}')
+        self.stdout.write(f'  duplicates:  {duplicates}')
+        if duplicates or total != n_proc * n_ids:
+            raise CommandError(f'{duplicates} duplicate IDs, {total} of {n_proc * n_ids} IDs found.')
+        if not all(ordered for _, ordered in results):
+            raise CommandError('IDs from one thread were not strictly increasing.')
+        self.stdout.write(self.style.SUCCESS('OK - no collisions.'))
@@ -0,0 +1,24 @@
+"""
+Expire online payment attempts the gateway has not answered within
+PAYMENT_GATEWAY['TIMEOUT_SECONDS'] (e.g. a webhook lost in a restart): the attempt becomes
+'expired' and its Payment(s) go from 'processing' to 'failed', so the appointment shows Pay Now
+again. A capture that still arrives later is applied, or recorded as refund_due.
+Idempotent and quick when there is nothing to do - schedule it every minute, e.g. with cron:
+    * * * * * cd /path/to/project && python manage.py expire_pending_payments --quiet
+Run: python manage.py expire_pending_payments
+"""
+from django.core.management.base import BaseCommand
+
+from payments.processing import expire_stale_attempts
+
+
+class Command(BaseCommand):
+    help = 'Mark pending gateway payments older than the gateway timeout as failed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiet', action='store_true', help='Only print when something changed')
+
+    def handle(self, *args, **options):
+        count = expire_stale_attempts()
+        if count or not options['quiet']:
+            self.stdout.write(self.style.SUCCESS(f'Expired {count} pending payments.'))
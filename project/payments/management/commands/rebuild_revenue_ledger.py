@@ -0,0 +1,20 @@
+"""
+Rebuild the DailyRevenue ledger from all paid / failed Payment rows, read in chunks.
+Run after bulk imports or raw SQL changes to payments_payment, or queryset.update() of service
+locations, which bypass the ledger updates (Service.save() moves the branch itself).
+Run: python manage.py rebuild_revenue_ledger [--chunk-size 5000]
+"""
+from django.core.management.base import BaseCommand
+
+from payments import ledger
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily revenue ledger (dashboard revenue figures) from all payments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Payments read per query')
+
+    def handle(self, *args, **options):
+        counted, rows = ledger.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Revenue ledger rebuilt: {counted} payments in {rows} ledger rows.'))
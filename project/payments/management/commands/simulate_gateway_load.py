@@ -0,0 +1,145 @@
+"""
+Load test for online payments through the local gateway simulator (payments/gateway.py).
+Many users POST the payment form at once; each request only records a pending attempt and
+hands it to the gateway, so its latency should stay far below the simulated gateway latency.
+The command then waits for every webhook to be applied by the worker pool and checks that each
+Payment / Appointment matches its attempt's outcome.
+Synthetic users/service/appointments are created for the run and deleted afterwards.
+Run: python manage.py simulate_gateway_load --payments 200 --concurrency 20
+"""
+import re
+import statistics
+import threading
+import time as timer
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+from django.test import Client
+from django.urls import reverse
+
+from bookings.models import Appointment
+from payments.models import Payment, PaymentAttempt
+from payments.webhooks import get_pool
+from services.models import Service
+
+KEY_RE = re.compile(r'name="idempotency_key" value="([^"]+)"')
+USER_PREFIX = 'gateway_load_user_'
+
+
+def _percentile(samples, p):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+
+class Command(BaseCommand):
+    help = 'POST many online payments through the gateway simulator and check every outcome.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=200, help='Payments to submit')
+        parser.add_argument('--concurrency', type=int, default=20, help='Parallel clients')
+        parser.add_argument('--timeout', type=int, default=120, help='Seconds to wait for all webhooks')
+
+    def handle(self, *args, **options):
+        n, concurrency = options['payments'], options['concurrency']
+        service = Service.objects.create(name='Gateway Load Service', price=499, is_active=False)
+        users = [User.objects.create_user(username=f'{USER_PREFIX}{i}') for i in range(concurrency)]
+        start_day = date.today() + timedelta(days=1)
+        appointments = Appointment.objects.bulk_create([
+            Appointment(
+                user=users[i % concurrency], service=service, status='pending',
+                date=start_day + timedelta(days=i // 40), time=time(9 + (i % 40) // 4, (i % 4) * 15),
+            )
+            for i in range(n)
+        ])
+        try:
+            latencies = self._submit(users, appointments, concurrency)
+            settle_time = self._wait(appointments, options['timeout'])
+            problems = self._check(appointments)
+        finally:
+            PaymentAttempt.objects.filter(user__in=users).delete()
+            Appointment.objects.filter(service=service).delete()
+            service.delete()
+            User.objects.filter(pk__in=[u.pk for u in users]).delete()
+
+        low, high = settings.PAYMENT_GATEWAY['LATENCY_MS']
+        self.stdout.write(f'{n} payments from {concurrency} parallel clients (gateway latency {low}-{high} ms)')
+        self.stdout.write(
+            f'  POST latency  mean {statistics.mean(latencies):8.1f} ms   '
+            f'p95 {_percentile(latencies, 0.95):8.1f} ms   max {max(latencies):8.1f} ms'
+        )
+        self.stdout.write(f'  all webhooks applied {settle_time:.2f}s after the last POST')
+        for problem in problems[:10]:
+            self.stdout.write(self.style.ERROR(f'  {problem}'))
+        if problems:
+            raise CommandError(f'{len(problems)} payments did not end in the state their webhook reported.')
+        self.stdout.write(self.style.SUCCESS('OK - every payment matches its gateway outcome.'))
+
+    def _submit(self, users, appointments, concurrency):
+        """POST every payment form; returns the per-request latencies (ms)."""
+        by_user = {}
+        for appointment in appointments:
+            by_user.setdefault(appointment.user_id, []).append(appointment)
+        latencies = []
+        lock = threading.Lock()
+
+        def run(user, client):
+            close_old_connections()
+            try:
+                for appointment in by_user.get(user.pk, []):
+                    url = reverse('payment', args=[appointment.pk])
+                    key = KEY_RE.search(client.get(url).content.decode()).group(1)
+                    t = timer.perf_counter()
+                    response = client.post(url, {'pay_mode': 'razorpay', 'idempotency_key': key})
+                    elapsed = (timer.perf_counter() - t) * 1000
+                    if response.status_code != 302:
+                        raise CommandError(f'POST {url} answered {response.status_code}')
+                    with lock:
+                        latencies.append(elapsed)
+            finally:
+                connection.close()
+
+        clients = []
+        for user in users[:concurrency]:  # Log in first - 20 session INSERTs at once would contend.
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            clients.append(client)
+        threads = [threading.Thread(target=run, args=pair) for pair in zip(users, clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return latencies
+
+    def _wait(self, appointments, timeout):
+        """Block until no attempt is pending and the webhook queue is drained."""
+        t0 = timer.perf_counter()
+        pending = PaymentAttempt.objects.filter(appointment__in=appointments, outcome='pending')
+        while pending.exists():
+            if timer.perf_counter() - t0 > timeout:
+                raise CommandError(f'{pending.count()} payments still pending after {timeout}s')
+            timer.sleep(0.2)
+        get_pool().join()
+        return timer.perf_counter() - t0
+
+    def _check(self, appointments):
+        attempts = {a.appointment_id: a for a in PaymentAttempt.objects.filter(appointment__in=appointments)}
+        payments = {p.appointment_id: p for p in Payment.objects.filter(appointment__in=appointments)}
+        statuses = dict(Appointment.objects.filter(pk__in=[a.pk for a in appointments]).values_list('pk', 'status'))
+        problems = []
+        for appointment in appointments:
+            attempt, payment = attempts.get(appointment.pk), payments.get(appointment.pk)
+            expected_status = 'confirmed' if attempt and attempt.outcome == 'paid' else 'pending'
+            if attempt is None or payment is None:
+                problems.append(f'appointment {appointment.pk}: no attempt or payment recorded')
+            elif (payment.status, payment.transaction_id) != (attempt.outcome, attempt.transaction_id):
+                problems.append(
+                    f'appointment {appointment.pk}: payment {payment.status} {payment.transaction_id!r}, '
+                    f'attempt {attempt.outcome} {attempt.transaction_id!r}'
+                )
+            elif statuses[appointment.pk] != expected_status:
+                problems.append(f'appointment {appointment.pk}: {statuses[appointment.pk]}, expected {expected_status}')
+        outcomes = [a.outcome for a in attempts.values()]
+        self.stdout.write(f'  outcomes: {outcomes.count("paid")} paid, {outcomes.count("failed")} failed')
+        return problems
@@ -0,0 +1,114 @@
+"""
+Stress test for idempotent payments (payments/processing.py): many threads POST the payment
+form for one appointment at the same moment.
+Round 1 - every thread submits the same idempotency key (double-click / retries): exactly one
+PaymentAttempt may be written and every response must carry the same outcome.
+Round 2 - every thread submits its own freshly rendered form (many open tabs) for a new
+appointment: exactly one payment may succeed.
+Synthetic user/service/appointments are created for the run and deleted afterwards.
+Run: python manage.py stress_payment_idempotency --threads 50
+"""
+import re
+import threading
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+from django.test import Client
+from django.urls import reverse
+
+from bookings.models import Appointment
+from payments.models import Payment, PaymentAttempt
+from services.models import Service
+
+KEY_RE = re.compile(r'name="idempotency_key" value="([^"]+)"')
+
+
+class Command(BaseCommand):
+    help = 'Fire parallel payment POSTs at one appointment and check that it is paid exactly once.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50, help='Concurrent payment POSTs per round')
+
+    def handle(self, *args, **options):
+        n = options['threads']
+        user = User.objects.create_user(username='payment_stress_user')
+        service = Service.objects.create(name='Payment Stress Service', price=499, is_active=False)
+        day = date.today() + timedelta(days=1)
+        try:
+            problems = []
+            for label, shared_key, minute in (('same key', True, 0), ('separate keys', False, 30)):
+                appointment = Appointment.objects.create(
+                    user=user, service=service, date=day, time=time(11, minute), status='pending',
+                )
+                problems += self._round(label, n, user, appointment, shared_key)
+        finally:
+            PaymentAttempt.objects.filter(user=user).delete()
+            Appointment.objects.filter(service=service).delete()
+            service.delete()
+            user.delete()
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(f'  {problem}'))
+        if problems:
+            raise CommandError('Payments were not idempotent under concurrency.')
+        self.stdout.write(self.style.SUCCESS('OK - each appointment was paid exactly once.'))
+
+    def _round(self, label, n, user, appointment, shared_key):
+        url = reverse('payment', args=[appointment.pk])
+        clients = []
+        for _ in range(n):
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(user)
+            clients.append(client)
+        # One page render (= one key) for all threads, or one render per thread.
+        keys = [KEY_RE.search(c.get(url).content.decode()).group(1) for c in clients[:1 if shared_key else n]]
+        if shared_key:
+            keys *= n
+
+        barrier = threading.Barrier(n)
+        results = []
+        lock = threading.Lock()
+
+        def post(client, key):
+            close_old_connections()
+            try:
+                barrier.wait()
+                try:
+                    response = client.post(url, {'pay_mode': 'salon', 'idempotency_key': key})
+                    outcome = f'{response.status_code} {response.get("Location", "")}'
+                except Exception as exc:  # report, do not hide, anything unexpected
+                    outcome = f'error: {exc!r}'
+                with lock:
+                    results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post, args=(c, k)) for c, k in zip(clients, keys)]
+        t0 = timer.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = timer.perf_counter() - t0
+
+        attempts = list(PaymentAttempt.objects.filter(appointment=appointment))
+        payment = Payment.objects.filter(appointment=appointment).first()
+        appointment.refresh_from_db()
+        errors = [r for r in results if r.startswith('error') or not r.startswith('302')]
+        self.stdout.write(f'{label}: {n} parallel POSTs in {elapsed:.2f}s')
+        self.stdout.write(
+            f'  attempts stored: {len(attempts)}, payment: {payment.status if payment else None} '
+            f'{payment.transaction_id if payment else ""}, appointment: {appointment.status}, '
+            f'unexpected responses: {len(errors)}'
+        )
+        problems = [f'{label}: {e}' for e in errors[:5]]
+        if len(attempts) != 1:
+            problems.append(f'{label}: expected 1 payment attempt, found {len(attempts)}')
+        if payment is None or payment.status != 'paid' or (
+                attempts and payment.transaction_id != attempts[0].transaction_id):
+            problems.append(f'{label}: payment row does not match the single recorded attempt')
+        if appointment.status != 'confirmed':
+            problems.append(f'{label}: appointment is {appointment.status}, expected confirmed')
+        return problems
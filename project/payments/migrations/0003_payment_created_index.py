@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_savedpaymentmethod'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at'], name='pay_created_idx'),
+        ),
+    ]
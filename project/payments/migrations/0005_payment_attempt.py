@@ -0,0 +1,37 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_appointment_status_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0004_cart_payment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64)),
+                ('outcome', models.CharField(choices=[('paid', 'Paid'), ('failed', 'Failed')], max_length=20)),
+                ('transaction_id', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_attempts', to='bookings.appointment')),
+                ('cart_payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='payments.cartpayment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='paymentattempt',
+            constraint=models.UniqueConstraint(fields=('idempotency_key',), name='payattempt_unique_key'),
+        ),
+    ]
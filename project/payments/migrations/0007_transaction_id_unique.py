@@ -0,0 +1,25 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_payment_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cartpayment',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_id', ''), _negated=True), fields=('transaction_id',), name='cartpay_unique_txn'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('transaction_id', ''), _negated=True), ('cart_payment__isnull', True)), fields=('transaction_id',), name='pay_unique_txn'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_id', ''), _negated=True), fields=('transaction_id',), name='payattempt_unique_txn'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:38
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def build_daily_revenue(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    DailyRevenue = apps.get_model('payments', 'DailyRevenue')
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    rows = Payment.objects.filter(status__in=('paid', 'failed')).values_list(
+        'created_at', 'method', 'status', 'amount', 'appointment__service__location',
+    )
+    for created_at, method, status, amount, branch in rows.iterator(chunk_size=5000):
+        bucket = totals[(timezone.localdate(created_at), method, status, (branch or '').strip())]
+        bucket[0] += 1
+        bucket[1] += amount
+    DailyRevenue.objects.bulk_create([
+        DailyRevenue(date=day, method=method, status=status, branch=branch, count=count, amount=amount)
+        for (day, method, status, branch), (count, amount) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_transaction_id_unique'),
+        ('services', '0003_add_service_location'),  # build_daily_revenue reads the service's location.
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('online', 'Online')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('paid', 'Paid'), ('failed', 'Failed')], max_length=20)),
+                ('branch', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily revenue',
+                'ordering': ['-date', 'branch', 'method', 'status'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrevenue',
+            constraint=models.UniqueConstraint(fields=('date', 'method', 'status', 'branch'), name='dailyrev_unique_key'),
+        ),
+        migrations.RunPython(build_daily_revenue, migrations.RunPython.noop),
+    ]
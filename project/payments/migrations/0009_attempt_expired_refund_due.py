@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0008_daily_revenue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentattempt',
+            name='outcome',
+            field=models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('failed', 'Failed'), ('expired', 'Expired'), ('refund_due', 'Refund due')], max_length=20),
+        ),
+    ]
@@ -1,10 +1,17 @@
 """
 Payments app - demo/simulated payment only.
-Payment per Appointment; SavedPaymentMethod for profile (demo cards).
+Payment per Appointment; CartPayment groups the Payments of one cart checkout;
+PaymentAttempt records each submitted payment form by its idempotency key;
+DailyRevenue holds per-day totals of paid / failed payments (payments/ledger.py);
+SavedPaymentMethod for profile (demo cards).
 """
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 
+# Transaction IDs are unique (payments/ids.py); failed / unpaid rows have none ('').
+HAS_TRANSACTION_ID = ~Q(transaction_id='')
+
 
 class SavedPaymentMethod(models.Model):
     """Demo saved card - last 4 digits, type, nickname. No real card data."""
@@ -31,6 +38,33 @@ class SavedPaymentMethod(models.Model):
         return f"****{self.last_four} ({self.get_card_type_display()})"
 
 
+class CartPayment(models.Model):
+    """One consolidated payment for every appointment booked in a single cart checkout."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('paid', 'Paid'),
+        ('failed', 'Failed'),
+    ]
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='cart_payments'
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    transaction_id = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['transaction_id'], condition=HAS_TRANSACTION_ID, name='cartpay_unique_txn'),
+        ]
+
+    def __str__(self):
+        return f"Cart payment {self.id} - {self.amount} ({self.status})"
+
+
 class Payment(models.Model):
     """Payment record for an appointment - simulated gateway."""
     METHOD_CHOICES = [
@@ -40,6 +74,7 @@ class Payment(models.Model):
     ]
     STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('processing', 'Processing'),  # sent to the gateway, waiting for its webhook
         ('paid', 'Paid'),
         ('failed', 'Failed'),
     ]
@@ -51,11 +86,101 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     method = models.CharField(max_length=20, choices=METHOD_CHOICES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    transaction_id = models.CharField(max_length=100, blank=True)  # Demo: pay_xxx format for Razorpay-like
+    transaction_id = models.CharField(max_length=100, blank=True)  # pay_xxx (Razorpay-like), see payments/ids.py
+    cart_payment = models.ForeignKey(
+        CartPayment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payments'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Admin panel payments list ordered by -created_at
+            models.Index(fields=['-created_at'], name='pay_created_idx'),
+        ]
+        constraints = [
+            # The Payments of one cart checkout share the CartPayment's transaction ID.
+            models.UniqueConstraint(
+                fields=['transaction_id'], condition=HAS_TRANSACTION_ID & Q(cart_payment__isnull=True),
+                name='pay_unique_txn',
+            ),
+        ]
 
     def __str__(self):
         return f"Payment {self.id} - {self.amount} ({self.status})"
+
+
+class PaymentAttempt(models.Model):
+    """
+    One submitted payment form, keyed by the idempotency key issued when the page rendered
+    (payments/processing.py). The unique key means a double-click or browser retry cannot pay
+    twice: the repeat finds this row and gets the same outcome and transaction ID back.
+    """
+    OUTCOME_CHOICES = [
+        ('pending', 'Pending'),  # waiting for the gateway webhook
+        ('paid', 'Paid'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),  # no webhook within PAYMENT_GATEWAY['TIMEOUT_SECONDS']
+        ('refund_due', 'Refund due'),  # captured after the payment was settled otherwise
+    ]
+    idempotency_key = models.CharField(max_length=64)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='payment_attempts'
+    )
+    appointment = models.ForeignKey(
+        'bookings.Appointment',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='payment_attempts'
+    )
+    cart_payment = models.ForeignKey(
+        CartPayment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attempts'
+    )
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES)
+    transaction_id = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['idempotency_key'], name='payattempt_unique_key'),
+            models.UniqueConstraint(fields=['transaction_id'], condition=HAS_TRANSACTION_ID, name='payattempt_unique_txn'),
+        ]
+
+    def __str__(self):
+        return f"Payment attempt {self.idempotency_key} ({self.outcome})"
+
+
+class DailyRevenue(models.Model):
+    """
+    Count and amount of the paid / failed Payments created on one day, per method, status and
+    branch (the service's location). Kept up to date in the same transaction as the Payment
+    writes (payments/ledger.py), so revenue figures read a few rows instead of every payment.
+    """
+    date = models.DateField()
+    method = models.CharField(max_length=20, choices=Payment.METHOD_CHOICES)
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    branch = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-date', 'branch', 'method', 'status']
+        verbose_name_plural = 'Daily revenue'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'method', 'status', 'branch'], name='dailyrev_unique_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.branch or '-'} {self.method} {self.status}: {self.count} / {self.amount}"
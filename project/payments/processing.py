@@ -0,0 +1,319 @@
+"""
+Idempotent payment processing (simulated gateway).
+Every render of a payment page issues a signed idempotency key (issue_key). Submitting the form
+inserts a PaymentAttempt with that key first; its unique constraint makes a double-click,
+browser retry or parallel POST with the same key find the original attempt and get the same
+outcome and transaction ID back, with no new writes.
+The rest of a successful payment is one transaction with one write per row: the attempt,
+the Payment (a conditional UPDATE, or an INSERT if there is none yet) and the Appointment
+(or, for a cart, the CartPayment and one UPDATE per table for its payments / appointments).
+A second key for an already paid appointment (two open tabs) is refused with AlreadyPaid, and
+one for an appointment whose online payment is still processing with PaymentInProgress.
+Online payments go through the gateway (payments/gateway.py): start_gateway_payment records a
+pending attempt and returns at once, and complete_gateway_payment applies the outcome when the
+gateway's signed webhook arrives (payments/webhooks.py) - at most once per attempt. Attempts
+with no answer after PAYMENT_GATEWAY['TIMEOUT_SECONDS'] are expired (expire_stale_attempts,
+`manage.py expire_pending_payments`) so the appointment can be paid again.
+Paid / failed payments are counted into the DailyRevenue ledger (payments/ledger.py) in the
+same transaction.
+"""
+import logging
+import time as _time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction, IntegrityError, OperationalError
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from bookings.models import Appointment
+from . import ledger
+from .ids import new_transaction_id
+from .models import CartPayment, Payment, PaymentAttempt
+
+IDEMPOTENCY_SALT = 'payments.idempotency'
+# A payment page older than this must be reloaded before paying.
+IDEMPOTENCY_MAX_AGE = 24 * 60 * 60
+PAY_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+class AlreadyPaid(Exception):
+    """The appointment / cart was already paid by another attempt."""
+
+
+class PaymentInProgress(Exception):
+    """Another attempt is still waiting for the gateway's answer."""
+
+
+def issue_key(user, target):
+    """Signed idempotency key for one payment form of `user` for `target` (e.g. 'appointment:5')."""
+    return signing.dumps({'u': user.pk, 't': target, 'k': uuid.uuid4().hex}, salt=IDEMPOTENCY_SALT)
+
+
+def read_key(token, user, target):
+    """The idempotency key inside `token` if it was issued to `user` for `target`, else None."""
+    try:
+        data = signing.loads(token or '', salt=IDEMPOTENCY_SALT, max_age=IDEMPOTENCY_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if data.get('u') != user.pk or data.get('t') != target:
+        return None
+    return data.get('k')
+
+
+def find_attempt(key):
+    """The attempt already recorded for this key, if any (a repeated submit)."""
+    return PaymentAttempt.objects.filter(idempotency_key=key).first()
+
+
+def _run_once(key, write):
+    """
+    Run write() (which must create the PaymentAttempt for `key` first) in one transaction.
+    Returns (attempt, replayed). A concurrent request that committed the same key first wins,
+    and its attempt is returned instead.
+    """
+    for attempt_no in range(PAY_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return write(), False
+        except IntegrityError:
+            existing = find_attempt(key)
+            if existing is not None:
+                return existing, True
+            raise AlreadyPaid()  # Lost the race to create the Payment row under another key.
+        except OperationalError:
+            if attempt_no == PAY_ATTEMPTS - 1:
+                raise
+            _time.sleep(0.05 * (attempt_no + 1))  # SQLite "database is locked" - back off and retry.
+
+
+# Statuses a new payment may overwrite. 'processing' is an online attempt waiting for the
+# gateway: it is only left by that attempt's webhook or by expiring it (expire_stale_attempts).
+PAYABLE_STATUSES = ('pending', 'failed')
+
+
+def _write_appointment_payment(appointment, method, status, transaction_id, from_statuses=PAYABLE_STATUSES):
+    """
+    Set the appointment's Payment (one UPDATE if it is in `from_statuses`, or INSERT if none) and
+    confirm it if paid. Raises PaymentInProgress / AlreadyPaid if it is processing / paid.
+    """
+    fields = {
+        'amount': appointment.service.price, 'method': method,
+        'status': status, 'transaction_id': transaction_id,
+    }
+    payment = Payment.objects.filter(appointment=appointment)
+    writable = payment.filter(status__in=from_statuses)
+    before = ledger.snapshot(writable)
+    if writable.update(**fields):
+        ledger.move(before, status, method, fields['amount'])
+    else:
+        current = payment.values_list('status', flat=True).first()
+        if current == 'processing':
+            raise PaymentInProgress()
+        if current is not None:
+            raise AlreadyPaid()
+        Payment.objects.create(appointment=appointment, **fields)  # Counted by the ledger's signals.
+    if status == 'paid':
+        Appointment.objects.filter(pk=appointment.pk, status='pending').update(status='confirmed')
+
+
+def cart_payable(cart_payment):
+    """The cart's Payments a cart payment still covers: not cancelled, not paid / being paid on their own."""
+    return cart_payment.payments.exclude(appointment__status='cancelled').filter(status__in=PAYABLE_STATUSES)
+
+
+def cart_amount_due(cart_payment):
+    """What paying the cart charges now - the checkout total minus cancelled / separately paid."""
+    return cart_payable(cart_payment).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+
+def cart_processing(cart_payment):
+    """True while an online attempt (for the cart or one of its appointments) awaits the gateway."""
+    return cart_payment.payments.exclude(appointment__status='cancelled').filter(status='processing').exists()
+
+
+def _write_cart_payment(cart_payment, method, status, transaction_id, from_statuses=PAYABLE_STATUSES):
+    """Set the CartPayment and its payable Payments / Appointments - one UPDATE per table."""
+    if 'processing' not in from_statuses and cart_processing(cart_payment):
+        raise PaymentInProgress()
+    payments = cart_payment.payments.exclude(appointment__status='cancelled').filter(status__in=from_statuses)
+    before = ledger.snapshot(payments)
+    if not before:
+        if cart_processing(cart_payment):
+            raise PaymentInProgress()  # Another tab started an online payment meanwhile.
+        raise AlreadyPaid()  # Every appointment was cancelled or paid on its own - nothing to charge.
+    if status != 'processing':
+        fields = {'status': status, 'transaction_id': transaction_id}
+        if status == 'paid':
+            fields['amount'] = sum(amount for _, _, _, amount, _ in before)  # What was charged.
+        cart = CartPayment.objects.filter(pk=cart_payment.pk).exclude(status='paid')
+        if not cart.update(**fields):
+            raise AlreadyPaid()
+    elif CartPayment.objects.filter(pk=cart_payment.pk, status='paid').exists():
+        raise AlreadyPaid()
+    payments.update(status=status, method=method, transaction_id=transaction_id)
+    ledger.move(before, status, method)
+    if status == 'paid':
+        Appointment.objects.filter(payment__cart_payment=cart_payment, status='pending').update(status='confirmed')
+
+
+def _attempts_touching(appointment=None, cart_payment=None):
+    """Q for attempts that set the same Payment(s): the target's own and its cart's / appointments'."""
+    if appointment is not None:
+        return Q(appointment=appointment) | Q(cart_payment__payments__appointment=appointment)
+    return Q(cart_payment=cart_payment) | Q(appointment__payment__cart_payment=cart_payment)
+
+
+def _write(attempt_fields, method, status, transaction_id):
+    """
+    Insert the PaymentAttempt, then write its Payment(s). Runs inside _run_once's transaction, so
+    the PaymentInProgress / AlreadyPaid checks and the write are one atomic step.
+    """
+    attempt = PaymentAttempt.objects.create(
+        outcome='pending' if status == 'processing' else status,
+        transaction_id=transaction_id, **attempt_fields,
+    )
+    # After the INSERT: SQLite cannot turn a read transaction into a write one under contention.
+    target = {name: attempt_fields.get(name) for name in ('appointment', 'cart_payment')}
+    expire_stale_attempts(_attempts_touching(**target))
+    if attempt.appointment_id:
+        _write_appointment_payment(attempt.appointment, method, status, transaction_id)
+    else:
+        _write_cart_payment(attempt.cart_payment, method, status, transaction_id)
+    return attempt
+
+
+def pay_appointment(user, appointment, key, method, succeeded):
+    """
+    Record the outcome of paying for one appointment. Returns (PaymentAttempt, replayed).
+    Raises PaymentInProgress while an online attempt for it awaits the gateway.
+    """
+    existing = find_attempt(key)
+    if existing is not None:
+        return existing, True
+    status = 'paid' if succeeded else 'failed'
+    transaction_id = new_transaction_id() if succeeded else ''
+    fields = {'idempotency_key': key, 'user': user, 'appointment': appointment}
+    return _run_once(key, lambda: _write(fields, method, status, transaction_id))
+
+
+def pay_cart(user, cart_payment, key, method, succeeded):
+    """
+    Record the outcome of paying for a whole cart checkout. Returns (PaymentAttempt, replayed).
+    Raises PaymentInProgress while an online attempt for it awaits the gateway.
+    """
+    existing = find_attempt(key)
+    if existing is not None:
+        return existing, True
+    status = 'paid' if succeeded else 'failed'
+    transaction_id = new_transaction_id() if succeeded else ''
+    fields = {'idempotency_key': key, 'user': user, 'cart_payment': cart_payment}
+    return _run_once(key, lambda: _write(fields, method, status, transaction_id))
+
+
+def _gateway_timeout():
+    return timedelta(seconds=settings.PAYMENT_GATEWAY['TIMEOUT_SECONDS'])
+
+
+def start_gateway_payment(user, key, method, appointment=None, cart_payment=None):
+    """
+    Record a pending attempt (Payment(s) set to 'processing') for the gateway to decide.
+    Returns (PaymentAttempt, replayed); the caller then hands a new attempt to the gateway.
+    Raises PaymentInProgress while another attempt for the same Payment(s) awaits its webhook:
+    the 'processing' status is set by a conditional UPDATE in the attempt's transaction, so two
+    tabs with different keys cannot both start a charge.
+    """
+    existing = find_attempt(key)
+    if existing is not None:
+        return existing, True
+    target = {'appointment': appointment} if appointment is not None else {'cart_payment': cart_payment}
+    fields = {'idempotency_key': key, 'user': user, **target}
+    return _run_once(key, lambda: _write(fields, method, 'processing', ''))
+
+
+def _expire(attempt):
+    """Give up on one pending attempt: outcome 'expired' and its 'processing' Payment(s) 'failed'."""
+    if not PaymentAttempt.objects.filter(pk=attempt.pk, outcome='pending').update(outcome='expired'):
+        return False  # Completed (or expired) meanwhile.
+    if attempt.appointment_id:
+        processing = Payment.objects.filter(appointment_id=attempt.appointment_id, status='processing')
+    else:
+        processing = Payment.objects.filter(cart_payment_id=attempt.cart_payment_id, status='processing')
+    before = ledger.snapshot(processing)
+    processing.update(status='failed')
+    ledger.move(before, 'failed', 'online')
+    return True
+
+
+def expire_stale_attempts(*filters):
+    """
+    Expire pending attempts (matching `filters`) older than PAYMENT_GATEWAY['TIMEOUT_SECONDS'],
+    so a lost webhook does not leave a Payment 'processing' for ever and it can be paid again.
+    A capture that still arrives later is applied or recorded for refund (complete_gateway_payment).
+    Returns how many attempts were expired.
+    """
+    stale = PaymentAttempt.objects.filter(
+        *filters, outcome='pending', created_at__lt=timezone.now() - _gateway_timeout(),
+    ).only('pk', 'appointment_id', 'cart_payment_id')
+    expired = 0
+    for attempt in stale.distinct():
+        with transaction.atomic():
+            expired += _expire(attempt)
+    return expired
+
+
+def _apply_outcome(attempt, status, transaction_id, from_statuses):
+    """Write the gateway's answer to the attempt's Payment(s); an unusable capture becomes refund_due."""
+    try:
+        with transaction.atomic():
+            if attempt.appointment_id:
+                _write_appointment_payment(attempt.appointment, 'online', status, transaction_id, from_statuses)
+            else:
+                _write_cart_payment(attempt.cart_payment, 'online', status, transaction_id, from_statuses)
+    except (AlreadyPaid, PaymentInProgress):
+        if status == 'paid':
+            PaymentAttempt.objects.filter(pk=attempt.pk).update(outcome='refund_due')
+            logger.warning(
+                'Gateway captured %s for attempt %s after its payment was settled otherwise - refund it.',
+                transaction_id, attempt.pk,
+            )
+
+
+def complete_gateway_payment(attempt_id, succeeded, transaction_id):
+    """
+    Apply the gateway's answer for a pending or expired attempt. Returns False if the attempt
+    was already completed (a duplicate webhook) or does not exist, so redelivery is harmless.
+    A capture that cannot be applied - the target was paid meanwhile, or a newer attempt is
+    processing it - is kept with outcome 'refund_due' and its transaction ID, and logged.
+    """
+    status = 'paid' if succeeded else 'failed'
+    transaction_id = transaction_id if succeeded else ''
+    for attempt_no in range(PAY_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Claim the attempt with a conditional UPDATE first - a duplicate webhook finds none.
+                for was in ('pending', 'expired'):
+                    claimed = PaymentAttempt.objects.filter(pk=attempt_id, outcome=was)
+                    if claimed.update(outcome=status, transaction_id=transaction_id):
+                        break
+                else:
+                    return False
+                attempt = PaymentAttempt.objects.select_related(
+                    'appointment__service', 'cart_payment',
+                ).get(pk=attempt_id)
+                if was == 'pending':
+                    _apply_outcome(attempt, status, transaction_id, ('processing',))
+                elif succeeded:
+                    # Expired: its Payment(s) were already set failed, but the money was taken -
+                    # pay them now if nothing else has, else refund.
+                    _apply_outcome(attempt, status, transaction_id, PAYABLE_STATUSES)
+            return True
+        except OperationalError:
+            if attempt_no == PAY_ATTEMPTS - 1:
+                raise
+            _time.sleep(0.05 * (attempt_no + 1))  # SQLite "database is locked" - back off and retry.
@@ -0,0 +1,56 @@
+"""
+Payments app signals - keep the DailyRevenue ledger in sync with Payment.save() and deletes,
+and with edits to a Service's location (its payments' branch). queryset.update() callers
+update it themselves, see payments/ledger.py. Connected in PaymentsConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete
+from django.dispatch import receiver
+
+from services.models import Service
+from . import ledger
+from .models import Payment
+
+
+@receiver(pre_save, sender=Payment)
+def payment_saving(sender, instance, raw=False, **kwargs):
+    before = []
+    if instance.pk and not raw:
+        before = ledger.rows(Payment.objects.filter(pk=instance.pk))
+    instance._ledger_before = before
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_ledger_before', [])
+    if raw or (instance.status not in ledger.TRACKED_STATUSES and not before):
+        return
+    after = [(
+        instance.created_at, instance.method, instance.status, instance.amount,
+        instance.appointment.service.location,
+    )]
+    ledger.replace(before, after)
+
+
+@receiver(pre_delete, sender=Payment)
+def payment_deleting(sender, instance, **kwargs):
+    # Before the delete, while the appointment and service rows (for the branch) still exist.
+    if instance.status in ledger.TRACKED_STATUSES:
+        ledger.record(ledger.rows(Payment.objects.filter(pk=instance.pk)), -1)
+
+
+@receiver(pre_save, sender=Service)
+def service_saving(sender, instance, raw=False, **kwargs):
+    old_location = None
+    if instance.pk and not raw:
+        old_location = Service.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+    instance._ledger_old_location = old_location
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, raw=False, **kwargs):
+    old_location = getattr(instance, '_ledger_old_location', None)
+    if raw or old_location is None or old_location.strip() == (instance.location or '').strip():
+        return
+    with transaction.atomic():
+        ledger.rebranch(instance.pk, old_location)
@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('<int:appointment_id>/', views.payment_view, name='payment'),
+    path('cart/<int:cart_payment_id>/', views.cart_payment_view, name='cart_payment'),
+    path('webhook/', views.payment_webhook_view, name='payment_webhook'),
 ]
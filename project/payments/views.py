@@ -2,26 +2,81 @@
 Payments app - Simulated payment only.
 User selects Cash/Card/Online; for Online we simulate success/failure.
 On success: Payment status=Paid, generate demo transaction_id, redirect to My Appointments.
+Each payment page carries an idempotency key (payments/processing.py), so a repeated submit
+gets the original result instead of paying twice.
+Online payments are handed to the gateway (payments/gateway.py) and the request returns at once;
+the outcome arrives by signed webhook (payment_webhook_view) and is applied by a worker pool.
 """
-import random
-import string
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from bookings.models import Appointment
-from .models import Payment
+from .gateway import SIGNATURE_HEADER, TIMESTAMP_HEADER, get_gateway
+from .models import CartPayment, SavedPaymentMethod
+from .processing import (
+    AlreadyPaid, PaymentInProgress, cart_amount_due, cart_payable, cart_processing, find_attempt,
+    issue_key, pay_appointment, pay_cart, read_key, start_gateway_payment,
+)
+from .webhooks import receive_webhook
 
+PROCESSING_MESSAGE = 'Payment submitted - it is being processed and will show as paid in a moment.'
 
-def _generate_demo_transaction_id():
-    """Generate Razorpay-style demo transaction ID (pay_xxxxxxxxxxxx)."""
-    return 'pay_' + ''.join(random.choices(string.ascii_lowercase + string.digits, k=14))
+
+def _payment_result(request, attempt, context, target):
+    """Success -> message + My Appointments; failure -> the payment page again with a new key."""
+    if attempt.outcome == 'pending':
+        messages.info(request, PROCESSING_MESSAGE)
+        return redirect('my_appointments')
+    if attempt.outcome == 'paid':
+        messages.success(request, f'Payment successful! Transaction ID: {attempt.transaction_id}')
+        return redirect('my_appointments')
+    if attempt.outcome == 'refund_due':
+        messages.info(request, f'This was already paid - the charge {attempt.transaction_id} will be refunded.')
+        return redirect('my_appointments')
+    if attempt.outcome == 'expired':
+        messages.error(request, 'The payment gateway did not answer in time. Try again.')
+    else:
+        messages.error(request, 'Payment failed (simulated). Try again.')
+    return render(request, 'payments/payment.html', {**context, 'idempotency_key': issue_key(request.user, target)})
+
+
+def _start_online_payment(request, key, amount, **target):
+    """
+    Record a pending attempt and hand it to the gateway; returns without waiting for it.
+    'Failure' on the demo form acts as a test card that is always declined; otherwise the
+    gateway decides (settings.PAYMENT_GATEWAY['FAILURE_RATE']).
+    """
+    attempt, replayed = start_gateway_payment(request.user, key, 'online', **target)
+    if not replayed:
+        force_outcome = False if request.POST.get('simulate_success', '1') == '0' else None
+        get_gateway().charge(attempt.pk, amount, force_outcome=force_outcome)
+    return attempt
 
 
 @login_required
 def payment_view(request, appointment_id):
     """Razorpay-style payment page: Cards, UPI, Netbanking (demo). Saves pay_xxx transaction ID."""
-    appointment = get_object_or_404(Appointment, pk=appointment_id, user=request.user)
+    appointment = get_object_or_404(
+        Appointment.objects.select_related('service', 'payment'), pk=appointment_id, user=request.user,
+    )
+    target = f'appointment:{appointment.pk}'
+    amount = appointment.service.price
+    context = {
+        'appointment': appointment,
+        'amount': amount,
+        'saved_methods': SavedPaymentMethod.objects.filter(user=request.user),
+    }
+
+    if request.method == 'POST':
+        key = read_key(request.POST.get('idempotency_key'), request.user, target)
+        attempt = find_attempt(key) if key else None
+        if attempt is not None:  # Double-click / retry: same answer, nothing written.
+            return _payment_result(request, attempt, context, target)
+
     if appointment.status == 'cancelled':
         messages.error(request, 'This appointment is cancelled.')
         return redirect('my_appointments')
@@ -30,56 +85,85 @@ def payment_view(request, appointment_id):
         messages.info(request, 'This appointment is already paid.')
         return redirect('my_appointments')
 
-    amount = appointment.service.price
-    from .models import SavedPaymentMethod
-    saved_methods = SavedPaymentMethod.objects.filter(user=request.user)
-
     if request.method == 'POST':
-        pay_mode = request.POST.get('pay_mode')  # razorpay (card/upi/netbanking) or salon (cash)
-        if pay_mode == 'salon':
-            # Pay at salon (cash/card at counter) - no gateway
-            payment, created = Payment.objects.get_or_create(
-                appointment=appointment,
-                defaults={'amount': amount, 'method': 'cash', 'status': 'pending'}
-            )
-            payment.amount = amount
-            payment.method = 'cash'
-            payment.status = 'paid'
-            payment.transaction_id = _generate_demo_transaction_id()
-            payment.save()
-            appointment.status = 'confirmed'
-            appointment.save()
-            messages.success(request, f'Payment recorded. Transaction ID: {payment.transaction_id}')
-            return redirect('my_appointments')
-        # Razorpay-style online payment (demo)
-        payment, created = Payment.objects.get_or_create(
-            appointment=appointment,
-            defaults={'amount': amount, 'method': 'online', 'status': 'pending'}
-        )
-        payment.amount = amount
-        payment.method = 'online'
-        payment.save()
-        simulate_success = request.POST.get('simulate_success', '1') == '1'
-        if simulate_success:
-            payment.status = 'paid'
-            payment.transaction_id = _generate_demo_transaction_id()
-            payment.save()
-            appointment.status = 'confirmed'
-            appointment.save()
-            messages.success(request, f'Payment successful! Transaction ID: {payment.transaction_id}')
-            return redirect('my_appointments')
+        if key is None:
+            messages.error(request, 'This payment page has expired. Please try again.')
         else:
-            payment.status = 'failed'
-            payment.save()
-            messages.error(request, 'Payment failed (simulated). Try again.')
-            return render(request, 'payments/payment.html', {
-                'appointment': appointment,
-                'amount': amount,
-                'saved_methods': saved_methods,
-            })
-
-    return render(request, 'payments/payment.html', {
-        'appointment': appointment,
+            pay_mode = request.POST.get('pay_mode')  # razorpay (card/upi/netbanking) or salon (cash)
+            try:
+                if pay_mode == 'salon':
+                    # Pay at salon (cash/card at counter) - no gateway, recorded as paid now.
+                    attempt, _ = pay_appointment(request.user, appointment, key, 'cash', True)
+                else:
+                    attempt = _start_online_payment(request, key, amount, appointment=appointment)
+            except AlreadyPaid:
+                messages.info(request, 'This appointment is already paid.')
+                return redirect('my_appointments')
+            except PaymentInProgress:
+                messages.info(request, 'A payment for this appointment is already being processed.')
+                return redirect('my_appointments')
+            return _payment_result(request, attempt, context, target)
+
+    return render(request, 'payments/payment.html', {**context, 'idempotency_key': issue_key(request.user, target)})
+
+
+@login_required
+def cart_payment_view(request, cart_payment_id):
+    """Pay once for every appointment booked in a cart checkout. Same demo flow as payment_view."""
+    cart_payment = get_object_or_404(CartPayment, pk=cart_payment_id, user=request.user)
+    target = f'cart:{cart_payment.pk}'
+    # Only what is still payable: appointments cancelled or paid on their own since checkout
+    # are left out of the list and the amount.
+    payments = cart_payable(cart_payment).select_related('appointment__service')
+    amount = cart_amount_due(cart_payment)
+    context = {
+        'cart_payment': cart_payment,
+        'payments': payments,
         'amount': amount,
-        'saved_methods': saved_methods,
-    })
+        'saved_methods': SavedPaymentMethod.objects.filter(user=request.user),
+    }
+
+    if request.method == 'POST':
+        key = read_key(request.POST.get('idempotency_key'), request.user, target)
+        attempt = find_attempt(key) if key else None
+        if attempt is not None:  # Double-click / retry: same answer, nothing written.
+            return _payment_result(request, attempt, context, target)
+
+    if cart_payment.status == 'paid':
+        messages.info(request, 'These appointments are already paid.')
+        return redirect('my_appointments')
+    if not amount and cart_processing(cart_payment):
+        messages.info(request, 'A payment for these appointments is already being processed.')
+        return redirect('my_appointments')
+    if not amount:
+        messages.info(request, 'Nothing left to pay - these appointments were cancelled or paid separately.')
+        return redirect('my_appointments')
+
+    if request.method == 'POST':
+        if key is None:
+            messages.error(request, 'This payment page has expired. Please try again.')
+        else:
+            try:
+                if request.POST.get('pay_mode') == 'salon':
+                    attempt, _ = pay_cart(request.user, cart_payment, key, 'cash', True)
+                else:
+                    attempt = _start_online_payment(request, key, amount, cart_payment=cart_payment)
+            except AlreadyPaid:
+                messages.info(request, 'These appointments are already paid.')
+                return redirect('my_appointments')
+            except PaymentInProgress:
+                messages.info(request, 'A payment for these appointments is already being processed.')
+                return redirect('my_appointments')
+            return _payment_result(request, attempt, context, target)
+
+    return render(request, 'payments/payment.html', {**context, 'idempotency_key': issue_key(request.user, target)})
+
+
+@csrf_exempt
+@require_POST
+def payment_webhook_view(request):
+    """Gateway callback: verify the signature, queue the event for the workers, answer at once."""
+    status = receive_webhook(
+        request.body, request.headers.get(TIMESTAMP_HEADER), request.headers.get(SIGNATURE_HEADER),
+    )
+    return HttpResponse(status=status)
@@ -0,0 +1,106 @@
+"""
+Payment gateway webhooks - verify the signature, queue the event, answer at once.
+A bounded pool of worker threads (settings.PAYMENT_GATEWAY['WEBHOOK_WORKERS']) takes events
+off the queue and applies them with processing.complete_gateway_payment, which updates the
+PaymentAttempt, Payment(s) and Appointment(s) in one transaction and ignores duplicates.
+When the queue is full the endpoint answers 503 and the gateway retries later.
+"""
+import hmac
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .gateway import sign
+from .processing import complete_gateway_payment
+
+logger = logging.getLogger(__name__)
+
+EVENTS = {'payment.captured': True, 'payment.failed': False}
+
+
+def verify(body, timestamp, signature):
+    """True if the webhook was signed with our secret within the allowed clock window."""
+    try:
+        age = abs(time.time() - int(timestamp))
+    except (TypeError, ValueError):
+        return False
+    if age > settings.PAYMENT_GATEWAY['WEBHOOK_TOLERANCE_SECONDS']:
+        return False
+    return hmac.compare_digest(sign(body, timestamp), signature or '')
+
+
+class WebhookWorkerPool:
+    """Fixed number of threads draining a bounded queue of webhook events."""
+
+    def __init__(self, workers, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = workers
+        self._started = False
+        self._lock = threading.Lock()
+
+    def submit(self, event):
+        """Queue an event; raises queue.Full if the workers are too far behind."""
+        if not self._started:
+            self._start()
+        self.queue.put_nowait(event)
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f'payment-webhook-{i}', daemon=True).start()
+            self._started = True
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            close_old_connections()
+            try:
+                complete_gateway_payment(
+                    event['attempt_id'], EVENTS[event['event']], event.get('transaction_id', ''),
+                )
+            except Exception:
+                logger.exception('Could not apply payment webhook %r', event)
+            finally:
+                self.queue.task_done()
+
+    def join(self):
+        """Block until every queued event has been applied (load tests, shutdown)."""
+        self.queue.join()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                conf = settings.PAYMENT_GATEWAY
+                _pool = WebhookWorkerPool(conf['WEBHOOK_WORKERS'], conf['WEBHOOK_QUEUE_SIZE'])
+    return _pool
+
+
+def receive_webhook(body, timestamp, signature):
+    """Check and queue one webhook. Returns the HTTP status to answer the gateway with."""
+    if not verify(body, timestamp, signature):
+        return 400
+    try:
+        event = json.loads(body)
+        if event.get('event') not in EVENTS or not isinstance(event.get('attempt_id'), int):
+            return 400
+    except ValueError:
+        return 400
+    try:
+        get_pool().submit(event)
+    except queue.Full:
+        return 503
+    return 202
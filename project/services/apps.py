@@ -5,3 +5,6 @@ class ServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'services'
     verbose_name = 'Beauty Services'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registers signal handlers
@@ -0,0 +1,88 @@
+"""
+Catalog snapshot - active services (with display image URLs) and active staff, loaded once per
+worker process and shared by every request until the catalog changes.
+A global catalog version lives in the database (SharedVersion), so a bump reaches every worker
+process whatever the cache backend; services/signals.py bumps it whenever a Service or Staff row
+is saved or deleted (dashboard, Django admin, seed script). Each request only compares versions -
+one primary-key lookup - and the snapshot is rebuilt when they differ.
+"""
+import threading
+from types import MappingProxyType
+
+from .images import attach_display_image_urls
+from .models import Service, SharedVersion, Staff
+
+CATALOG_VERSION_NAME = 'catalog'
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def location_key(location):
+    """Facet key for a branch name - ' bandra' and 'Bandra' are the same branch."""
+    return location.strip().casefold()
+
+
+def location_facets(services):
+    """[(key, branch name, count)] for the services' branches, by name. Blank locations are skipped."""
+    names, counts = {}, {}
+    for service in services:
+        key = location_key(service.location)
+        if key:
+            names.setdefault(key, service.location.strip())
+            counts[key] = counts.get(key, 0) + 1
+    return sorted(((key, names[key], count) for key, count in counts.items()), key=lambda f: f[1])
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of the active catalog at one version. Treat the instances as immutable.
+    Per-branch facet counts and service lists are computed once per version, so filtering the
+    services page by branch costs no query and no GROUP BY.
+    """
+
+    def __init__(self, version, services, staff):
+        self.version = version
+        self.services = tuple(services)
+        self.staff = tuple(staff)
+        self.services_by_id = MappingProxyType({s.pk: s for s in self.services})
+        self.location_facets = tuple(location_facets(self.services))
+        by_location = {}
+        for service in self.services:
+            by_location.setdefault(location_key(service.location), []).append(service)
+        self.services_by_location = MappingProxyType({k: tuple(v) for k, v in by_location.items()})
+
+
+def catalog_version():
+    """Current global catalog version."""
+    return SharedVersion.current(CATALOG_VERSION_NAME)
+
+
+def bump_catalog_version():
+    """Mark every worker's snapshot as stale."""
+    SharedVersion.bump(CATALOG_VERSION_NAME)
+
+
+def service_order_key(service):
+    """Sort key of catalog.services - name, then pk as the unique tie-breaker (keyset cursors)."""
+    return (service.name, service.pk)
+
+
+def _build(version):
+    services = sorted(Service.objects.filter(is_active=True), key=service_order_key)
+    attach_display_image_urls(services)
+    staff = list(Staff.objects.filter(is_active=True))
+    return CatalogSnapshot(version, services, staff)
+
+
+def get_catalog():
+    """The snapshot for the current catalog version, rebuilding it if it is stale."""
+    global _snapshot
+    version = catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build(version)
+        return _snapshot
@@ -0,0 +1,64 @@
+"""
+Display images for service cards - service.image_url, else a stock photo picked by keyword in the
+service name. Keywords are compiled once into a single regex; the resolved URL is memoized per
+service and dropped by services/signals.py when the service is saved or deleted.
+"""
+import re
+
+# Optional image URLs for /services/ – matched by service name (case-insensitive substring).
+SERVICE_IMAGE_URLS = [
+    ('facial', 'https://img.freepik.com/premium-photo/young-beautiful-woman-is-receiving-facials-skincare-treatments-beauty-parlour_1218867-48453.jpg'),
+    ('hair color', 'https://img.freepik.com/premium-photo/young-beautiful-woman-is-receiving-hair-coloring-service-beauty-parlour_1218867-42504.jpg'),
+    ('hair colour', 'https://img.freepik.com/premium-photo/young-beautiful-woman-is-receiving-hair-coloring-service-beauty-parlour_1218867-42504.jpg'),
+    ('bridal', 'https://img.freepik.com/premium-photo/indian-bride-makeup-session-with-professional-artist-makeup-artist-touching-up-indian-bride_1284935-3688.jpg'),
+    ('haircut', 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRycYPswmagqysl-gIJ3D5xgYNvWeFTHBnVfA&s'),
+    ('styling', 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRycYPswmagqysl-gIJ3D5xgYNvWeFTHBnVfA&s'),
+    ('manicure', 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRMqxMcGb3BMgluJqutjQZ8CvFlkHkcVmTjFQ&s'),
+    ('pedicure', 'https://img.freepik.com/premium-photo/manicure-pedicure-beauty-salon-concept-womans-feet-with-cotton-flower_926199-2997825.jpg?semt=ais_user_personalization&w=740&q=80'),
+]
+
+# One pass over the name finds every keyword position (zero-width lookahead, so overlapping
+# keywords are all seen). The earliest keyword in SERVICE_IMAGE_URLS wins, as before.
+_KEYWORD_PRIORITY = {}
+for _i, (_keyword, _url) in enumerate(SERVICE_IMAGE_URLS):
+    _KEYWORD_PRIORITY.setdefault(_keyword, (_i, _url))
+_KEYWORD_RE = re.compile(
+    '(?=(%s))' % '|'.join(re.escape(k) for k, _ in SERVICE_IMAGE_URLS)
+)
+
+# service.id -> (name, image_url, resolved url)
+_display_url_cache = {}
+
+
+def match_keyword_image(name):
+    """Stock image URL for the first SERVICE_IMAGE_URLS keyword found in name, else None."""
+    best = None
+    for match in _KEYWORD_RE.finditer((name or '').lower()):
+        hit = _KEYWORD_PRIORITY[match.group(1)]
+        if best is None or hit[0] < best[0]:
+            best = hit
+    return best[1] if best else None
+
+
+def get_service_display_image_url(service):
+    """Return service.image_url if set, else keyword match from SERVICE_IMAGE_URLS, else None."""
+    if service.image_url:
+        return service.image_url
+    cached = _display_url_cache.get(service.pk)
+    if cached is not None and cached[0] == service.name and cached[1] == service.image_url:
+        return cached[2]
+    url = match_keyword_image(service.name)
+    if service.pk is not None:
+        _display_url_cache[service.pk] = (service.name, service.image_url, url)
+    return url
+
+
+def forget_service_image(service_id):
+    """Drop the memoized display URL of a service (called on save/delete)."""
+    _display_url_cache.pop(service_id, None)
+
+
+def attach_display_image_urls(services):
+    """Attach display_image_url on each service (list or single)."""
+    for s in (services if hasattr(services, '__iter__') and not isinstance(services, (str, dict)) else [services]):
+        s.display_image_url = get_service_display_image_url(s)
@@ -0,0 +1,125 @@
+"""
+In-memory index of distinct Service.location values for the dashboard location suggestions.
+Locations are kept sorted by their case-folded form, so prefix matches are a binary search;
+substring matches (second, after prefixes) scan only the distinct locations, not the services.
+services/signals.py updates this process's index in place when a Service is saved or deleted
+and bumps a shared version in the database (SharedVersion); other worker processes see the new
+version and rebuild their copy with one query on the next lookup.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from .models import Service, SharedVersion
+
+LOCATIONS_VERSION_NAME = 'locations'
+SUGGESTION_LIMIT = 15
+
+
+class LocationIndex:
+    """Distinct locations with a per-location service count, sorted case-insensitively."""
+
+    def __init__(self, version=None, rows=()):
+        self.version = version
+        self._by_service = {}   # service pk -> location
+        self._counts = {}       # location -> number of services using it
+        self._sorted = []       # (casefolded location, location), distinct, sorted
+        for pk, location in rows:
+            self.set_location(pk, location)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def set_location(self, pk, location):
+        """Record that service `pk` now has `location` (blank removes it from the index)."""
+        location = (location or '').strip()
+        if self._by_service.get(pk) == location:
+            return
+        self.discard(pk)
+        if not location:
+            return
+        self._by_service[pk] = location
+        count = self._counts.get(location, 0)
+        self._counts[location] = count + 1
+        if count == 0:
+            insort(self._sorted, (location.casefold(), location))
+
+    def discard(self, pk):
+        location = self._by_service.pop(pk, None)
+        if location is None:
+            return
+        self._counts[location] -= 1
+        if not self._counts[location]:
+            del self._counts[location]
+            entry = (location.casefold(), location)
+            i = bisect_left(self._sorted, entry)
+            if i < len(self._sorted) and self._sorted[i] == entry:
+                del self._sorted[i]
+
+    def suggest(self, q, limit=SUGGESTION_LIMIT):
+        """Locations starting with `q` (case-insensitive) first, then ones containing it."""
+        q = q.strip().casefold()
+        if not q:
+            return []
+        results = []
+        i = bisect_left(self._sorted, (q,))
+        while i < len(self._sorted) and len(results) < limit and self._sorted[i][0].startswith(q):
+            results.append(self._sorted[i][1])
+            i += 1
+        if len(results) < limit:
+            for folded, location in self._sorted:
+                if q in folded and not folded.startswith(q):
+                    results.append(location)
+                    if len(results) == limit:
+                        break
+        return results
+
+
+_index = LocationIndex()
+_lock = threading.Lock()
+
+
+def locations_version():
+    """Current shared version of the location index."""
+    return SharedVersion.current(LOCATIONS_VERSION_NAME)
+
+
+def get_index():
+    """This process's index, rebuilt from the database if another process changed a service."""
+    global _index
+    version = locations_version()
+    if _index.version == version:
+        return _index
+    with _lock:
+        if _index.version != version:
+            _index = LocationIndex(version, Service.objects.exclude(location='').values_list('pk', 'location'))
+        return _index
+
+
+def suggest_locations(q, limit=SUGGESTION_LIMIT):
+    return get_index().suggest(q, limit)
+
+
+def _apply(change):
+    """Apply `change(index)` to this process's index and publish a new shared version."""
+    with _lock:
+        new_version = SharedVersion.bump(LOCATIONS_VERSION_NAME)
+        # Only if nobody else bumped since this index was built; a stale index is left alone
+        # and get_index() rebuilds it under the new version.
+        if _index.version == new_version - 1:
+            change(_index)
+            _index.version = new_version
+
+
+def service_location_saved(pk, location):
+    _apply(lambda index: index.set_location(pk, location))
+
+
+def service_location_removed(pk):
+    _apply(lambda index: index.discard(pk))
+
+
+def reset_index():
+    """Forget this process's index (the next lookup rebuilds it)."""
+    global _index
+    with _lock:
+        _index = LocationIndex()
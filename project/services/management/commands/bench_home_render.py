@@ -0,0 +1,46 @@
+"""
+Benchmark rendering of the home page (services/home.html) with and without the cached
+service fragments. "Uncached" deletes the fragment keys before every render.
+Run: python manage.py bench_home_render --renders 500
+"""
+import time as timer
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from services.catalog import get_catalog
+from services.views import home_view
+
+HOME_FRAGMENTS = ('home_featured_services', 'home_latest_services')
+
+
+class Command(BaseCommand):
+    help = 'Time home page renders with cold vs warm fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=500, help='Renders per mode')
+
+    def handle(self, *args, **options):
+        n = options['renders']
+        request = RequestFactory().get('/', HTTP_HOST='localhost')
+        request.user = AnonymousUser()
+        version = get_catalog().version
+        keys = [make_template_fragment_key(name, [version]) for name in HOME_FRAGMENTS]
+
+        def run(clear):
+            t0 = timer.perf_counter()
+            for _ in range(n):
+                if clear:
+                    cache.delete_many(keys)
+                home_view(request)
+            return (timer.perf_counter() - t0) * 1000 / n
+
+        home_view(request)  # warm up template loading and the catalog snapshot
+        before = run(clear=True)
+        after = run(clear=False)
+        self.stdout.write(f'services/home.html, {n} renders each:')
+        self.stdout.write(f'  fragments re-rendered: {before:.3f} ms / render')
+        self.stdout.write(f'  fragments from cache:  {after:.3f} ms / render ({before / after:.1f}x)')
@@ -0,0 +1,26 @@
+"""
+Import contact form / feedback submissions left in the write-behind spool directory
+(services/writebehind.py), e.g. after a worker was killed.
+By default only files no live worker can still be writing to are imported; use --all when the
+site is stopped (or from a deploy hook) to import everything.
+Run: python manage.py flush_write_behind [--all]
+"""
+from django.core.management.base import BaseCommand
+
+from services import writebehind
+
+
+class Command(BaseCommand):
+    help = 'Import spooled contact form and feedback submissions into the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Also import spool files that may still be open (only when no workers are running).',
+        )
+
+    def handle(self, *args, **options):
+        buffer = writebehind.get_buffer()
+        min_age = 0 if options['all'] else buffer.orphan_age
+        count = writebehind.recover_orphans(buffer.spool_dir, min_age)
+        self.stdout.write(self.style.SUCCESS(f'Imported {count} spooled submissions from {buffer.spool_dir}.'))
@@ -0,0 +1,19 @@
+"""
+Rebuild the RatingSummary totals (count, sum, per-star buckets) from all Feedback rows.
+Run after bulk imports or raw SQL changes to services_feedback, which bypass the signals.
+Run: python manage.py rebuild_rating_summary
+"""
+from django.core.management.base import BaseCommand
+
+from services.models import RatingSummary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the rating summary shown on the home and testimonials pages from all feedback.'
+
+    def handle(self, *args, **options):
+        summary = RatingSummary.rebuild()
+        buckets = ', '.join(f'{star}*: {n}' for star, n, _ in summary.histogram())
+        self.stdout.write(self.style.SUCCESS(
+            f'Rating summary rebuilt: {summary.count} ratings, average {summary.average or "-"} ({buckets}).'
+        ))
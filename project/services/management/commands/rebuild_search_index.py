@@ -0,0 +1,20 @@
+"""
+Rebuild the FTS5 service search index from the services table.
+Run: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+
+from services import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FTS5 full-text index used by the services search.'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write(self.style.WARNING(
+                'FTS5 index not available (run migrate on SQLite with FTS5); search uses icontains fallback.'
+            ))
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} services.'))
@@ -0,0 +1,39 @@
+# FTS5 full-text index for Service search (services/search.py).
+# Skipped on databases without FTS5; search then falls back to icontains.
+
+from django.db import migrations, DatabaseError
+
+FTS_TABLE = 'services_service_fts'
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, description, location, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    except DatabaseError:
+        return  # SQLite built without FTS5
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, name, description, location) '
+        'SELECT id, name, description, location FROM services_service'
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_add_service_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
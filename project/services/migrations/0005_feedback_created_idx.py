@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_service_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['created_at'], name='feedback_created_idx'),
+        ),
+    ]
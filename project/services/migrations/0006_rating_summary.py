@@ -0,0 +1,46 @@
+# Generated by Django 4.2.28 on 2026-10-18 10:26
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def build_rating_summary(apps, schema_editor):
+    Feedback = apps.get_model('services', 'Feedback')
+    RatingSummary = apps.get_model('services', 'RatingSummary')
+    stars = (1, 2, 3, 4, 5)
+    valid = Q(rating__in=stars)
+    agg = Feedback.objects.aggregate(
+        count=Count('pk', filter=valid),
+        total=Sum('rating', filter=valid),
+        **{f'stars_{star}': Count('pk', filter=Q(rating=star)) for star in stars},
+    )
+    agg['total'] = agg['total'] or 0
+    RatingSummary.objects.update_or_create(pk=1, defaults=agg)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_feedback_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Rating summary',
+            },
+        ),
+        migrations.RunPython(build_rating_summary, migrations.RunPython.noop),
+    ]
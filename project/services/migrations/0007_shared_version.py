@@ -0,0 +1,20 @@
+# Generated by Django 4.2.28 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0006_rating_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,7 +1,10 @@
 """
-Services app models: Service, Staff, Feedback, Contact.
+Services app models: Service, Staff, Feedback, RatingSummary, Contact, SharedVersion.
 """
-from django.db import models
+from collections import Counter
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
 
 
 class Service(models.Model):
@@ -51,11 +54,91 @@ class Feedback(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Testimonials keyset pagination (-created_at, -id): scanned backwards, the index also
+            # yields -id order, since SQLite index entries end with the rowid.
+            models.Index(fields=['created_at'], name='feedback_created_idx'),
+        ]
 
     def __str__(self):
         return f"Feedback by {self.user.username} - {self.rating} stars"
 
 
+class RatingSummary(models.Model):
+    """
+    Running totals over all Feedback - one row (pk=1), so pages can show the average rating and
+    star histogram without aggregating the Feedback table. Kept up to date by services/signals.py
+    (one UPDATE per Feedback created or deleted, or per batch from services/writebehind.py); rebuild with `manage.py rebuild_rating_summary`.
+    """
+    SINGLETON_PK = 1
+    STARS = (5, 4, 3, 2, 1)
+
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Rating summary'
+
+    @classmethod
+    def current(cls):
+        """The summary row (an empty, unsaved one if it has never been built)."""
+        return cls.objects.filter(pk=cls.SINGLETON_PK).first() or cls(pk=cls.SINGLETON_PK)
+
+    @classmethod
+    def record(cls, rating, delta=1):
+        """Add (delta=1) or remove (delta=-1) one rating."""
+        cls.record_many([rating], delta)
+
+    @classmethod
+    def record_many(cls, ratings, delta=1):
+        """Add or remove several ratings at once, as a single UPDATE with F() expressions."""
+        buckets = Counter(r for r in ratings if r in cls.STARS)
+        if not buckets:
+            return
+        changes = {
+            'count': F('count') + delta * sum(buckets.values()),
+            'total': F('total') + delta * sum(star * n for star, n in buckets.items()),
+        }
+        for star, n in buckets.items():
+            changes[f'stars_{star}'] = F(f'stars_{star}') + delta * n
+        if not cls.objects.filter(pk=cls.SINGLETON_PK).update(**changes):
+            cls.rebuild()  # First feedback ever (or row missing) - count everything once.
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the summary from all Feedback rows. Returns the saved summary."""
+        valid = Q(rating__in=cls.STARS)
+        agg = Feedback.objects.aggregate(
+            count=Count('pk', filter=valid),
+            total=Sum('rating', filter=valid),
+            **{f'stars_{star}': Count('pk', filter=Q(rating=star)) for star in cls.STARS},
+        )
+        agg['total'] = agg['total'] or 0
+        summary, _ = cls.objects.update_or_create(pk=cls.SINGLETON_PK, defaults=agg)
+        return summary
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 1) if self.count else None
+
+    def histogram(self):
+        """[(stars, count, percent)] from 5 stars down to 1."""
+        rows = []
+        for star in self.STARS:
+            n = getattr(self, f'stars_{star}')
+            rows.append((star, n, round(100 * n / self.count) if self.count else 0))
+        return rows
+
+    def __str__(self):
+        return f"{self.average or '-'} from {self.count} ratings"
+
+
 class Contact(models.Model):
     """Contact form submission - stores name, email, message."""
     name = models.CharField(max_length=200)
@@ -69,3 +152,34 @@ class Contact(models.Model):
 
     def __str__(self):
         return f"Contact from {self.name}"
+
+
+class SharedVersion(models.Model):
+    """
+    Named version counters in the database, so every worker process sees a bump (the cache may
+    be per-process LocMem). Used for the catalog snapshot (services/catalog.py) and the location
+    index (services/locations.py): reading one is a primary-key lookup, bumping is one UPDATE.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def current(cls, name):
+        """The version of `name` (0 until it is first bumped)."""
+        version = cls.objects.filter(name=name).values_list('version', flat=True).first()
+        return version or 0
+
+    @classmethod
+    def bump(cls, name):
+        """Increment `name` and return the new version."""
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(version=F('version') + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(name=name, version=1)
+                except IntegrityError:
+                    cls.objects.filter(name=name).update(version=F('version') + 1)  # Created meanwhile.
+            return cls.current(name)
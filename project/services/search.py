@@ -0,0 +1,131 @@
+"""
+Service search - SQLite FTS5 index over Service name, description and location.
+Results are ranked with bm25 and every word is prefix-matched ("hai col" finds "Hair Colour").
+If FTS5 is not available (other DB, SQLite built without it, migration not run) we fall back
+to the plain icontains filter.
+At most MAX_RESULTS ranked matches are returned; search_services says when more exist, so the
+page can ask for a narrower search instead of silently dropping them.
+"""
+import re
+
+from django.db import connection, DatabaseError
+from django.db.models import Q, Case, When, IntegerField
+
+FTS_TABLE = 'services_service_fts'
+
+# bm25 weights per column (name, description, location) - a hit in the name counts most.
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Upper bound on ranked ids pulled from the index for one search.
+MAX_RESULTS = 500
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Set once the FTS table has been seen. A miss is not cached: the table may be created by a
+# migration run after this process started.
+_fts_ready = False
+
+
+def fts_available():
+    """True if the FTS5 table exists on the default (SQLite) database."""
+    global _fts_ready
+    if _fts_ready:
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+        )
+        _fts_ready = cursor.fetchone() is not None
+    return _fts_ready
+
+
+def build_match_query(q):
+    """Turn free text into an FTS5 MATCH expression: every word quoted and prefix-matched, ANDed."""
+    words = _WORD_RE.findall(q or '')
+    return ' '.join('"%s"*' % w for w in words)
+
+
+def index_service(service):
+    """Insert or replace one service's row in the FTS index."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [service.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, location) VALUES (%s, %s, %s, %s)',
+            [service.pk, service.name or '', service.description or '', service.location or ''],
+        )
+
+
+def remove_service(service_id):
+    """Drop one service from the FTS index."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [service_id])
+
+
+def rebuild_index():
+    """Re-fill the FTS index from the services table. Returns number of rows indexed."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, location) '
+            'SELECT id, name, description, location FROM services_service'
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def _ranked_ids(match_query, active_only, limit):
+    """
+    Service ids matching the FTS query, best bm25 score first, at most `limit`. With active_only
+    the is_active filter is part of the query, so inactive services do not use up the limit.
+    """
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    active = 'AND s.is_active = 1 ' if active_only else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE} '
+            f'JOIN services_service s ON s.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s {active}'
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [match_query, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_filter(queryset, q):
+    """Old behaviour: unranked icontains over name, description and location."""
+    return queryset.filter(
+        Q(name__icontains=q) | Q(description__icontains=q) | Q(location__icontains=q)
+    )
+
+
+def search_services(queryset, q, active_only=False):
+    """
+    Filter a Service queryset by free text q; ordered by relevance when FTS5 is available.
+    Returns (queryset, truncated) - truncated is True when more than MAX_RESULTS services matched
+    and only the best MAX_RESULTS are included. Pass active_only=True when `queryset` only has
+    active services, so the limit counts active matches.
+    """
+    q = (q or '').strip()
+    if not q:
+        return queryset, False
+    match_query = build_match_query(q)
+    if not match_query or not fts_available():
+        return _fallback_filter(queryset, q), False
+    try:
+        ids = _ranked_ids(match_query, active_only, MAX_RESULTS + 1)
+    except DatabaseError:
+        return _fallback_filter(queryset, q), False
+    truncated = len(ids) > MAX_RESULTS
+    ids = ids[:MAX_RESULTS]
+    if not ids:
+        return queryset.none(), False
+    rank = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(rank), truncated
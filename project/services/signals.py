@@ -0,0 +1,51 @@
+"""
+Services app signals - keep the FTS5 search index, the memoized card image URLs, the location
+suggestion index and the catalog snapshot version in sync with Service / Staff rows, and the
+RatingSummary totals in sync with Feedback rows. Connected in ServicesConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Service, Staff, Feedback, RatingSummary
+from . import locations, search
+from .catalog import bump_catalog_version
+from .images import forget_service_image
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, **kwargs):
+    search.index_service(instance)
+    forget_service_image(instance.pk)
+    # After commit, so no worker rebuilds its snapshot from data that is not visible yet.
+    transaction.on_commit(bump_catalog_version)
+    pk, location = instance.pk, instance.location
+    transaction.on_commit(lambda: locations.service_location_saved(pk, location))
+
+
+@receiver(post_delete, sender=Service)
+def service_deleted(sender, instance, **kwargs):
+    search.remove_service(instance.pk)
+    forget_service_image(instance.pk)
+    transaction.on_commit(bump_catalog_version)
+    pk = instance.pk
+    transaction.on_commit(lambda: locations.service_location_removed(pk))
+
+
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def staff_changed(sender, instance, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Feedback)
+def feedback_saved(sender, instance, created, **kwargs):
+    if created:
+        RatingSummary.record(instance.rating)
+    else:
+        RatingSummary.rebuild()  # Rating edited (admin) - the old value is unknown here; rare.
+
+
+@receiver(post_delete, sender=Feedback)
+def feedback_deleted(sender, instance, **kwargs):
+    RatingSummary.record(instance.rating, delta=-1)
@@ -1,4 +1,4 @@
-from django.urls import path, re_path
+from django.urls import path
 from . import views
 
 urlpatterns = [
@@ -15,6 +15,4 @@ urlpatterns = [
     path('privacy/', views.privacy_view, name='privacy'),
     path('terms/', views.terms_view, name='terms'),
     path('feedback/', views.feedback_view, name='feedback'),
-    # Catch-all: show custom 404 even when DEBUG=True (Django otherwise shows debug 404 page)
-    re_path(r'^.+$', views.page_not_found),
 ]
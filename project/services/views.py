@@ -1,113 +1,169 @@
 """
 Services app - Homepage, Services list, Service detail, Contact, Feedback, 404.
 """
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect
+from django.http import Http404, JsonResponse, QueryDict
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from .models import Service, Staff, Feedback, Contact
-
-# Optional image URLs for /services/ – matched by service name (case-insensitive substring).
-SERVICE_IMAGE_URLS = [
-    ('facial', 'https://img.freepik.com/premium-photo/young-beautiful-woman-is-receiving-facials-skincare-treatments-beauty-parlour_1218867-48453.jpg'),
-    ('hair color', 'https://img.freepik.com/premium-photo/young-beautiful-woman-is-receiving-hair-coloring-service-beauty-parlour_1218867-42504.jpg'),
-    ('hair colour', 'https://img.freepik.com/premium-photo/young-beautiful-woman-is-receiving-hair-coloring-service-beauty-parlour_1218867-42504.jpg'),
-    ('bridal', 'https://img.freepik.com/premium-photo/indian-bride-makeup-session-with-professional-artist-makeup-artist-touching-up-indian-bride_1284935-3688.jpg'),
-    ('haircut', 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRycYPswmagqysl-gIJ3D5xgYNvWeFTHBnVfA&s'),
-    ('styling', 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRycYPswmagqysl-gIJ3D5xgYNvWeFTHBnVfA&s'),
-    ('manicure', 'https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcRMqxMcGb3BMgluJqutjQZ8CvFlkHkcVmTjFQ&s'),
-    ('pedicure', 'https://img.freepik.com/premium-photo/manicure-pedicure-beauty-salon-concept-womans-feet-with-cotton-flower_926199-2997825.jpg?semt=ais_user_personalization&w=740&q=80'),
-]
-
-
-def get_service_display_image_url(service):
-    """Return service.image_url if set, else keyword match from SERVICE_IMAGE_URLS, else None."""
-    if service.image_url:
-        return service.image_url
-    name_lower = (service.name or '').lower()
-    for keyword, url in SERVICE_IMAGE_URLS:
-        if keyword in name_lower:
-            return url
-    return None
-
-
-def _attach_display_image_urls(services):
-    """Attach display_image_url on each service (list or single)."""
-    for s in (services if hasattr(services, '__iter__') and not isinstance(services, (str, dict)) else [services]):
-        setattr(s, 'display_image_url', get_service_display_image_url(s))
+from .models import Service, Feedback, RatingSummary
+from . import writebehind
+from .search import MAX_RESULTS as MAX_SEARCH_RESULTS, search_services
+from .images import attach_display_image_urls
+from .catalog import (
+    get_catalog, catalog_version, service_order_key, location_key, location_facets,
+)
+from config.page_cache import anonymous_page_cache, CSRF_PLACEHOLDER
+from config.pagination import KeysetPage, paginate_keyset, paginate_sorted
+
+# Rendered home page sections live this long (they are also invalidated by catalog changes).
+HOME_FRAGMENT_CACHE_SECONDS = 60 * 60
+
+SERVICES_PER_PAGE = 12
+TESTIMONIALS_PER_PAGE = 9
+TESTIMONIAL_ORDERING = ['-created_at', '-id']
+
+
+def _render_listing(request, template, fragment_template, page, context):
+    """
+    Render one keyset page of a public listing. `next_url` (also used for <link rel="next">) is
+    this URL with the next cursor. With ?format=json only the page's cards are rendered and
+    returned as {"html", "next_url"}, so the page can load more without a full reload.
+    """
+    next_url = None
+    if page.has_next:
+        params = request.GET.copy()
+        params.pop('format', None)
+        params['cursor'] = page.next_cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    context = {**context, 'next_url': next_url}
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'html': render_to_string(fragment_template, context, request),
+            'next_url': next_url,
+        })
+    return render(request, template, context)
 
 
 def home_view(request):
-    """Homepage - show featured services, team, testimonials for landing sections."""
-    services = Service.objects.filter(is_active=True)[:6]
-    services_latest = Service.objects.filter(is_active=True)[:3]
-    _attach_display_image_urls(services)
-    _attach_display_image_urls(services_latest)
-    staff_list = Staff.objects.filter(is_active=True)[:4]
-    feedbacks = Feedback.objects.select_related('user').order_by('-created_at')[:6]
+    """
+    Homepage - featured and latest services. Those sections are cached as rendered fragments
+    keyed by the catalog version, so any Service/Staff save or delete (which bumps the version
+    via services/signals.py) invalidates them. Per-user bits stay outside the cached fragments.
+    """
+    catalog = get_catalog()
+    services = catalog.services[:6]
     return render(request, 'services/home.html', {
         'services': services,
-        'services_latest': services_latest,
-        'staff_list': staff_list,
-        'feedbacks': feedbacks,
+        'services_latest': services[:3],
+        'catalog_version': catalog.version,
+        'fragment_cache_seconds': HOME_FRAGMENT_CACHE_SECONDS,
+        'rating_summary': RatingSummary.current(),
     })
 
 
+def _facet_links(request, facets, selected, total):
+    """Branch facet pills ('All' first), each keeping the current search query."""
+    def url(location=None):
+        params = QueryDict(mutable=True)
+        if request.GET.get('q'):
+            params['q'] = request.GET['q']
+        if location:
+            params['location'] = location
+        return f'{request.path}?{params.urlencode()}' if params else request.path
+
+    links = [{'name': 'All', 'count': total, 'url': url(), 'active': not selected}]
+    for key, name, count in facets:
+        links.append({'name': name, 'count': count, 'url': url(name), 'active': key == selected})
+    return links
+
+
 def services_list_view(request):
-    """Services + Gallery combined page. Optional search by name, description, location."""
-    services = Service.objects.filter(is_active=True)
+    """
+    Services + Gallery combined page. Optional search by name, description, location (FTS5, ranked)
+    and branch facet (?location=), which can be combined.
+    Browsing is keyset-paginated over the catalog snapshot (?cursor=), whose per-branch counts and
+    lists are precomputed per catalog version. Search results are ranked, not keyset-ordered, and
+    come as one page of at most search.MAX_RESULTS (the page says when a search matched more);
+    their facet counts are taken from the results.
+    """
     q = (request.GET.get('q') or '').strip()
+    location = location_key(request.GET.get('location') or '')
     if q:
-        services = services.filter(
-            Q(name__icontains=q) | Q(description__icontains=q) | Q(location__icontains=q)
-        )
-    _attach_display_image_urls(services)
-    return render(request, 'services/services_gallery.html', {'services': services, 'search_query': q})
+        services, truncated = search_services(Service.objects.filter(is_active=True), q, active_only=True)
+        facets, total = location_facets(services), len(services)
+        if location:
+            services = [s for s in services if location_key(s.location) == location]
+        attach_display_image_urls(services)
+        page = KeysetPage(services, None)
+    else:
+        truncated = False
+        catalog = get_catalog()
+        facets, total = catalog.location_facets, len(catalog.services)
+        services = catalog.services_by_location.get(location, ()) if location else catalog.services
+        page = paginate_sorted(services, service_order_key, request.GET.get('cursor'), SERVICES_PER_PAGE)
+    return _render_listing(
+        request, 'services/services_gallery.html', 'services/_service_cards.html', page, {
+            'services': page,
+            'search_query': q,
+            'search_truncated': truncated,
+            'search_limit': MAX_SEARCH_RESULTS,
+            'location_facets': _facet_links(request, facets, location, total),
+            'selected_location': request.GET.get('location', '').strip() if location else '',
+        },
+    )
 
 
 def service_detail_view(request, pk):
     """Service detail page - includes staff list and OpenStreetMap."""
-    service = get_object_or_404(Service, pk=pk, is_active=True)
-    _attach_display_image_urls(service)
-    staff_list = Staff.objects.filter(is_active=True)
+    catalog = get_catalog()
+    service = catalog.services_by_id.get(pk)
+    if service is None:
+        raise Http404('No active service with this id.')
+    staff_list = catalog.staff
     return render(request, 'services/service_detail.html', {'service': service, 'staff_list': staff_list})
 
 
 def contact_view(request):
-    """Contact form - POST saves to Contact; redirects to about#contact. GET redirects to about#contact."""
+    """
+    Contact form - POST spools a Contact (written in batches by services/writebehind.py);
+    redirects to about#contact. GET redirects to about#contact.
+    """
     if request.method == 'POST':
         name = request.POST.get('name', '').strip()
         email = request.POST.get('email', '').strip()
         subject = request.POST.get('subject', '').strip()
         message = request.POST.get('message', '').strip()
         if name and email and message:
-            Contact.objects.create(name=name, email=email, subject=subject, message=message)
+            writebehind.submit_contact(name, email, subject, message)
             return redirect(reverse('about') + '?sent=1#contact')
     return redirect(reverse('about') + '#contact')
 
 
 @login_required
 def feedback_view(request):
-    """Submit feedback - rating and message, stored with user."""
+    """Submit feedback - rating and message, stored with user via the write-behind buffer."""
     if request.method == 'POST':
         rating = request.POST.get('rating', '5')
         message = request.POST.get('message', '').strip()
         try:
             r = int(rating)
             if 1 <= r <= 5:
-                Feedback.objects.create(user=request.user, rating=r, message=message)
+                writebehind.submit_feedback(request.user, r, message)
                 return redirect('home')
         except ValueError:
             pass
     return render(request, 'services/feedback.html')
 
 
+@anonymous_page_cache()
 def about_view(request):
-    return render(request, 'services/about.html')
+    return render(request, 'services/about.html', {'csrf_token': CSRF_PLACEHOLDER})
 
 
+@anonymous_page_cache(version=catalog_version)
 def team_view(request):
-    staff_list = Staff.objects.filter(is_active=True)
+    staff_list = get_catalog().staff
     return render(request, 'services/team.html', {'staff_list': staff_list})
 
 
@@ -117,24 +173,36 @@ def gallery_view(request):
 
 
 def offers_view(request):
-    services = Service.objects.filter(is_active=True)[:6]
-    _attach_display_image_urls(services)
+    services = get_catalog().services[:6]
     return render(request, 'services/offers.html', {'services': services})
 
 
+@anonymous_page_cache()
 def faq_view(request):
     return render(request, 'services/faq.html')
 
 
 def testimonials_view(request):
-    feedbacks = Feedback.objects.select_related('user').order_by('-created_at')[:10]
-    return render(request, 'services/testimonials.html', {'feedbacks': feedbacks})
-
-
+    """
+    Testimonials, newest first, keyset-paginated (?cursor=) with a JSON fragment mode.
+    The average / star histogram come from the maintained RatingSummary row, not an aggregate.
+    """
+    page = paginate_keyset(
+        Feedback.objects.select_related('user'), TESTIMONIAL_ORDERING,
+        request.GET.get('cursor'), TESTIMONIALS_PER_PAGE,
+    )
+    return _render_listing(
+        request, 'services/testimonials.html', 'services/_testimonial_cards.html', page,
+        {'feedbacks': page, 'rating_summary': RatingSummary.current()},
+    )
+
+
+@anonymous_page_cache()
 def privacy_view(request):
     return render(request, 'services/privacy.html')
 
 
+@anonymous_page_cache()
 def terms_view(request):
     return render(request, 'services/terms.html')
 
@@ -0,0 +1,206 @@
+"""
+Write-behind buffer for contact form and feedback submissions.
+A submission is appended (and fsync'ed) to this process's spool file under
+settings.WRITE_BEHIND['SPOOL_DIR'] - the request does not touch the database. A background
+thread inserts the spooled rows with bulk_create in one transaction once MAX_ITEMS are waiting
+or MAX_DELAY_SECONDS after the first one, so bookings and payments are not queued behind
+one write lock per form post.
+Spool files are claimed by an atomic rename (which also resets their mtime) before import, so
+two processes never import the same file. Files left behind by a worker that died are picked up by the next flush once they
+are untouched for 10 x MAX_DELAY_SECONDS (at least a minute), or by `manage.py flush_write_behind`. A crash between the commit
+and deleting the claimed file would import that batch again on recovery.
+bulk_create sends no signals, so the RatingSummary is updated here for spooled feedback.
+created_at is the insert time, i.e. up to MAX_DELAY_SECONDS after the submission.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, transaction
+
+from .models import Contact, Feedback, RatingSummary
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SUFFIX = '.jsonl'
+CLAIMED_SUFFIX = '.claimed'
+FLUSH_ATTEMPTS = 5
+
+
+def _save_contacts(rows):
+    Contact.objects.bulk_create([Contact(**row) for row in rows])
+
+
+def _save_feedback(rows):
+    # Skip feedback from accounts deleted while it was spooled (the FK would fail the batch).
+    user_ids = set(User.objects.filter(pk__in={row['user_id'] for row in rows}).values_list('pk', flat=True))
+    rows = [row for row in rows if row['user_id'] in user_ids]
+    Feedback.objects.bulk_create([Feedback(**row) for row in rows])
+    RatingSummary.record_many(row['rating'] for row in rows)
+
+
+SAVERS = {'contact': _save_contacts, 'feedback': _save_feedback}
+
+
+def _config():
+    conf = getattr(settings, 'WRITE_BEHIND', {})
+    return (
+        Path(conf.get('SPOOL_DIR', settings.BASE_DIR / 'spool')),
+        conf.get('MAX_ITEMS', 50),
+        conf.get('MAX_DELAY_SECONDS', 5),
+    )
+
+
+def import_spool_file(path):
+    """Insert every submission in a claimed spool file (one transaction), then delete it."""
+    rows_by_kind = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a worker that died mid-write.
+            if record.get('kind') in SAVERS:
+                rows_by_kind.setdefault(record['kind'], []).append(record['fields'])
+    for attempt in range(FLUSH_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                for kind, rows in rows_by_kind.items():
+                    SAVERS[kind](rows)
+            break
+        except OperationalError:
+            if attempt == FLUSH_ATTEMPTS - 1:
+                raise
+            time.sleep(0.1 * (attempt + 1))  # SQLite "database is locked" - back off and retry.
+    os.remove(path)
+    return sum(len(rows) for rows in rows_by_kind.values())
+
+
+def _claim(path):
+    """Atomically take ownership of a spool file; None if another process got it first."""
+    claimed = path.with_name(f'{path.stem}-{uuid.uuid4().hex[:8]}{CLAIMED_SUFFIX}')
+    try:
+        os.replace(path, claimed)
+        # The rename keeps the old mtime: touch it, or recover_orphans() in another process
+        # would take an orphan we just claimed as stale and import it a second time.
+        os.utime(claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def recover_orphans(spool_dir, min_age):
+    """Import spool files untouched for `min_age` seconds (their writer is gone). Returns rows."""
+    if not spool_dir.is_dir():
+        return 0
+    now = time.time()
+    imported = 0
+    for path in sorted(spool_dir.iterdir()):
+        if path.suffix not in (SPOOL_SUFFIX, CLAIMED_SUFFIX):
+            continue
+        try:
+            if now - path.stat().st_mtime < min_age:
+                continue
+        except FileNotFoundError:
+            continue
+        claimed = _claim(path)
+        if claimed is not None:
+            imported += import_spool_file(claimed)
+    return imported
+
+
+class WriteBehindBuffer:
+    """Per-process spool file plus the thresholds that trigger a background flush."""
+
+    def __init__(self, spool_dir, max_items, max_delay):
+        self.spool_dir = Path(spool_dir)
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.orphan_age = max(60, 10 * max_delay)
+        self._lock = threading.Lock()
+        self._path = None
+        self._file = None
+        self._pending = 0
+        self._timer = None
+
+    def submit(self, kind, fields):
+        """Durably spool one submission; returns once it is on disk."""
+        line = json.dumps({'kind': kind, 'fields': fields}, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is None:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                self._path = self.spool_dir / f'{os.getpid()}-{uuid.uuid4().hex[:8]}{SPOOL_SUFFIX}'
+                self._file = open(self._path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending += 1
+            if self._pending >= self.max_items:
+                self._cancel_timer()
+                threading.Thread(target=self._flush_in_background, daemon=True).start()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _rotate(self):
+        """Close the current spool file and claim it for import. Call with the lock held."""
+        self._cancel_timer()
+        if self._file is None:
+            return None
+        self._file.close()
+        path, self._file, self._path, self._pending = self._path, None, None, 0
+        return _claim(path)
+
+    def flush(self):
+        """Insert everything spooled so far (and any orphaned spool files). Returns rows inserted."""
+        with self._lock:
+            claimed = self._rotate()
+        imported = import_spool_file(claimed) if claimed is not None else 0
+        return imported + recover_orphans(self.spool_dir, self.orphan_age)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            # The claimed file stays in the spool dir and is retried as an orphan later.
+            logger.exception('Write-behind flush failed')
+        finally:
+            connection.close()  # This thread's DB connection.
+
+
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """This process's buffer (a forked worker gets its own spool file)."""
+    global _buffer, _buffer_pid
+    if _buffer is None or _buffer_pid != os.getpid():
+        with _buffer_lock:
+            if _buffer is None or _buffer_pid != os.getpid():
+                _buffer = WriteBehindBuffer(*_config())
+                _buffer_pid = os.getpid()
+                atexit.register(_buffer._flush_in_background)  # Graceful worker exit.
+    return _buffer
+
+
+def submit_contact(name, email, subject, message):
+    get_buffer().submit('contact', {'name': name, 'email': email, 'subject': subject, 'message': message})
+
+
+def submit_feedback(user, rating, message):
+    get_buffer().submit('feedback', {'user_id': user.pk, 'rating': rating, 'message': message})
@@ -0,0 +1,65 @@
+/**
+ * Infinite scroll for keyset-paginated listings.
+ * Markup: a container [data-load-more-target] for the cards and an <a rel="next" data-load-more>
+ * link to the next page. The link still works without JS; with JS the next page's cards are
+ * fetched as a fragment (?format=json) and appended when the link scrolls into view or is clicked.
+ */
+(function() {
+  'use strict';
+
+  function reveal(el) {
+    if (typeof gsap !== 'undefined') {
+      gsap.to(el, { opacity: 1, y: 0, duration: 0.35, ease: 'power2.out' });
+    } else {
+      el.style.opacity = 1;
+      el.style.transform = 'none';
+    }
+  }
+
+  document.querySelectorAll('a[data-load-more]').forEach(function(link) {
+    var target = document.querySelector(link.dataset.loadMore);
+    if (!target) return;
+    var loading = false;
+
+    function loadNext() {
+      if (loading || !link.getAttribute('href')) return;
+      loading = true;
+      var url = link.getAttribute('href');
+      fetch(url + (url.indexOf('?') === -1 ? '?' : '&') + 'format=json', {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+      })
+        .then(function(r) { if (!r.ok) throw new Error(r.status); return r.json(); })
+        .then(function(data) {
+          var tmp = document.createElement('div');
+          tmp.innerHTML = data.html;
+          Array.prototype.slice.call(tmp.children).forEach(function(card) {
+            target.appendChild(card);
+            card.querySelectorAll('.reveal-card').forEach(reveal);
+          });
+          var headLink = document.querySelector('link[rel="next"]');
+          if (data.next_url) {
+            link.setAttribute('href', data.next_url);
+            if (headLink) headLink.setAttribute('href', data.next_url);
+          } else {
+            link.remove();
+            if (headLink) headLink.remove();
+            if (observer) observer.disconnect();
+          }
+          loading = false;
+        })
+        .catch(function() { window.location = url; });
+    }
+
+    link.addEventListener('click', function(e) {
+      e.preventDefault();
+      loadNext();
+    });
+    var observer = null;
+    if ('IntersectionObserver' in window) {
+      observer = new IntersectionObserver(function(entries) {
+        if (entries.some(function(entry) { return entry.isIntersecting; })) loadNext();
+      }, { rootMargin: '400px' });
+      observer.observe(link);
+    }
+  });
+})();